@@ -13,8 +13,9 @@ import numpy as np
 import re
 from datetime import date, timedelta
 from calendar import monthrange
-from models import get_session, Transaction, Category, Budget, BudgetItem
+from models import get_session, get_data_version, Transaction, Category, Budget, BudgetItem
 from collections import defaultdict
+from functools import lru_cache
 
 
 class AdvancedAnalytics:
@@ -38,13 +39,13 @@ class AdvancedAnalytics:
         }
     }
     
-    EXCLUDED_EXPENSE_CATEGORIES = [
+    EXCLUDED_EXPENSE_CATEGORIES = frozenset([
         'Credit Card Payment', 'Robinhood CC', 'Chase CC', 'Tally',
         'Transfer', 'Wire Transfer', 'Investments', 'Savings',
         'PayPal', 'Venmo',
-    ]
+    ])
     
-    ONE_TIME_CATEGORIES = ['Furniture', 'Home', 'Vacation', 'Travel']
+    ONE_TIME_CATEGORIES = frozenset(['Furniture', 'Home', 'Vacation', 'Travel'])
     
     def __init__(self):
         self.cc_payment_patterns = [
@@ -59,8 +60,15 @@ class AdvancedAnalytics:
             r'vanguard',
             r'schwab',
         ]
+        # Each pattern list as one compiled alternation
+        self._cc_payment_re = re.compile('|'.join(f'(?:{p})' for p in self.cc_payment_patterns))
+        self._investment_re = re.compile('|'.join(f'(?:{p})' for p in self.investment_patterns))
         self._budget_cache = None
         self._budget_cache_time = None
+        self._excluded_cache = (None, frozenset())  # (data version, excluded category IDs)
+        self._category_cache = (None, {})  # (data version, category ID -> row)
+        # Descriptions repeat across months, so reuse extracted merchant names
+        self._extract_merchant = lru_cache(maxsize=4096)(self._extract_merchant)
     
     def _get_active_budget(self, session, user_id=1):
         """Get the active budget with items."""
@@ -108,16 +116,12 @@ class AdvancedAnalytics:
     
     def _is_cc_payment(self, description):
         desc_lower = (description or '').lower()
-        for pattern in self.cc_payment_patterns:
-            if re.search(pattern, desc_lower):
-                return True
-        return False
+        return self._cc_payment_re.search(desc_lower) is not None
     
     def _is_investment_transfer(self, transaction):
         desc_lower = (transaction.description or '').lower()
-        for pattern in self.investment_patterns:
-            if re.search(pattern, desc_lower):
-                return True
+        if self._investment_re.search(desc_lower):
+            return True
         if 'robinhood' in desc_lower and 'card' not in desc_lower:
             amt = abs(transaction.amount)
             if amt >= 500 and amt % 500 == 0:
@@ -142,10 +146,26 @@ class AdvancedAnalytics:
             return 'base'
     
     def _get_excluded_category_ids(self, session):
-        cats = session.query(Category).filter(
-            Category.name.in_(self.EXCLUDED_EXPENSE_CATEGORIES)
-        ).all()
-        return {c.id for c in cats}
+        version = get_data_version()
+        cached_version, excluded_ids = self._excluded_cache
+        if cached_version != version:
+            cats = session.query(Category.id).filter(
+                Category.name.in_(self.EXCLUDED_EXPENSE_CATEGORIES)
+            ).all()
+            excluded_ids = frozenset(c.id for c in cats)
+            self._excluded_cache = (version, excluded_ids)
+        return excluded_ids
+    
+    def _get_category_index(self, session):
+        """Map category ID to its (id, name, group) row, reused until data changes."""
+        version = get_data_version()
+        cached_version, category_index = self._category_cache
+        if cached_version != version:
+            category_index = {
+                row.id: row for row in session.query(Category.id, Category.name, Category.group)
+            }
+            self._category_cache = (version, category_index)
+        return category_index
     
     def _is_actual_spending(self, transaction, category_name, excluded_ids):
         if transaction.category_id in excluded_ids:
@@ -183,14 +203,16 @@ class AdvancedAnalytics:
         try:
             today = date.today()
             excluded_ids = self._get_excluded_category_ids(session)
+            category_index = self._get_category_index(session)
             budget = self._get_active_budget(session, user_id)
             
             months_data = []
             
+            # Get the current month so far and the three full months before it
+            months = []
             for i in range(4):
                 if i == 0:
                     month_start = date(today.year, today.month, 1)
-                    month_end = today
                     days_in_month = monthrange(today.year, today.month)[1]
                     completeness = today.day / days_in_month
                 else:
@@ -200,15 +222,20 @@ class AdvancedAnalytics:
                         target_month += 12
                         target_year -= 1
                     month_start = date(target_year, target_month, 1)
-                    days_in_month = monthrange(target_year, target_month)[1]
-                    month_end = date(target_year, target_month, days_in_month)
                     completeness = 1.0
-                
-                transactions = session.query(Transaction).filter(
-                    Transaction.user_id == user_id,
-                    Transaction.date >= month_start,
-                    Transaction.date <= month_end
-                ).all()
+                months.append((i, month_start, completeness))
+            
+            # Fetch all four months at once and bucket them by month
+            transactions_by_month = defaultdict(list)
+            for t in session.query(Transaction).filter(
+                Transaction.user_id == user_id,
+                Transaction.date >= months[-1][1],
+                Transaction.date <= today
+            ):
+                transactions_by_month[(t.date.year, t.date.month)].append(t)
+            
+            for i, month_start, completeness in months:
+                transactions = transactions_by_month.get((month_start.year, month_start.month))
                 
                 if transactions:
                     base_income = 0
@@ -223,7 +250,7 @@ class AdvancedAnalytics:
                     category_spending = defaultdict(float)
                     
                     for t in transactions:
-                        cat = session.query(Category).filter_by(id=t.category_id).first()
+                        cat = category_index.get(t.category_id)
                         cat_name = cat.name if cat else 'Uncategorized'
                         
                         if t.amount > 0:
@@ -583,6 +610,7 @@ class AdvancedAnalytics:
             end_date = date.today()
             start_date = end_date - timedelta(days=lookback_days)
             excluded_ids = self._get_excluded_category_ids(session)
+            category_index = self._get_category_index(session)
             budget = self._get_active_budget(session, user_id)
             
             transactions = session.query(Transaction).filter(
@@ -596,7 +624,7 @@ class AdvancedAnalytics:
             
             expenses = []
             for t in transactions:
-                cat = session.query(Category).filter_by(id=t.category_id).first()
+                cat = category_index.get(t.category_id)
                 cat_name = cat.name if cat else 'Uncategorized'
                 if self._is_actual_spending(t, cat_name, excluded_ids):
                     life_event = self._get_life_event_context(t.date, cat_name)
@@ -679,6 +707,7 @@ class AdvancedAnalytics:
             end_date = date.today()
             start_date = end_date - timedelta(days=365)
             excluded_ids = self._get_excluded_category_ids(session)
+            category_index = self._get_category_index(session)
             budget = self._get_active_budget(session, user_id)
             
             transactions = session.query(Transaction).filter(
@@ -695,9 +724,9 @@ class AdvancedAnalytics:
             monthly_investments = defaultdict(float)
             
             for t in transactions:
-                cat = session.query(Category).filter_by(id=t.category_id).first()
+                cat = category_index.get(t.category_id)
                 cat_name = cat.name if cat else 'Uncategorized'
-                month_key = t.date.strftime('%Y-%m')
+                month_key = t.date.year * 12 + t.date.month - 1
                 
                 if self._is_investment_transfer(t):
                     monthly_investments[month_key] += abs(t.amount)
@@ -769,6 +798,7 @@ class AdvancedAnalytics:
             end_date = date.today()
             start_date = end_date - timedelta(days=90)
             excluded_ids = self._get_excluded_category_ids(session)
+            category_index = self._get_category_index(session)
             budget = self._get_active_budget(session, user_id)
             
             transactions = session.query(Transaction).filter(
@@ -787,7 +817,7 @@ class AdvancedAnalytics:
             house_expenses = []
             
             for t in transactions:
-                cat = session.query(Category).filter_by(id=t.category_id).first()
+                cat = category_index.get(t.category_id)
                 cat_name = cat.name if cat else 'Uncategorized'
                 
                 if t.amount > 0:
@@ -940,6 +970,7 @@ class AdvancedAnalytics:
             today = date.today()
             month_start = date(today.year, today.month, 1)
             excluded_ids = self._get_excluded_category_ids(session)
+            category_index = self._get_category_index(session)
             
             transactions = session.query(Transaction).filter(
                 Transaction.user_id == user_id,
@@ -950,7 +981,7 @@ class AdvancedAnalytics:
             # Calculate actual spending by category
             category_spending = defaultdict(float)
             for t in transactions:
-                cat = session.query(Category).filter_by(id=t.category_id).first()
+                cat = category_index.get(t.category_id)
                 cat_name = cat.name if cat else 'Uncategorized'
                 if self._is_actual_spending(t, cat_name, excluded_ids):
                     category_spending[cat_name] += abs(t.amount)
@@ -1033,6 +1064,7 @@ class AdvancedAnalytics:
             end_date = date.today()
             start_date = end_date - timedelta(days=months * 31)
             excluded_ids = self._get_excluded_category_ids(session)
+            category_index = self._get_category_index(session)
             
             transactions = session.query(Transaction).filter(
                 Transaction.user_id == user_id,
@@ -1047,18 +1079,22 @@ class AdvancedAnalytics:
             monthly_category = defaultdict(lambda: defaultdict(float))
             
             for t in transactions:
-                cat = session.query(Category).filter_by(id=t.category_id).first()
+                cat = category_index.get(t.category_id)
                 cat_name = cat.name if cat else 'Uncategorized'
                 
                 if self._is_actual_spending(t, cat_name, excluded_ids):
-                    month_key = t.date.strftime('%Y-%m')
+                    month_key = t.date.year * 12 + t.date.month - 1
                     monthly_category[month_key][cat_name] += abs(t.amount)
             
             if len(monthly_category) < 2:
                 return {"trends": [], "message": "Need at least 2 months of data"}
             
-            # Sort months chronologically
-            sorted_months = sorted(monthly_category.keys())
+            # Sort months chronologically, keyed as YYYY-MM
+            monthly_category = {
+                f'{key // 12:04d}-{key % 12 + 1:02d}': totals
+                for key, totals in sorted(monthly_category.items())
+            }
+            sorted_months = list(monthly_category)
             
             # Calculate trends for each category
             trends = []
@@ -1180,6 +1216,7 @@ class AdvancedAnalytics:
             end_date = date.today()
             start_date = end_date - timedelta(days=months * 31)
             excluded_ids = self._get_excluded_category_ids(session)
+            category_index = self._get_category_index(session)
             
             transactions = session.query(Transaction).filter(
                 Transaction.user_id == user_id,
@@ -1197,7 +1234,7 @@ class AdvancedAnalytics:
             })
             
             for t in transactions:
-                cat = session.query(Category).filter_by(id=t.category_id).first()
+                cat = category_index.get(t.category_id)
                 cat_name = cat.name if cat else 'Uncategorized'
                 
                 if not self._is_actual_spending(t, cat_name, excluded_ids):
@@ -1377,6 +1414,7 @@ class AdvancedAnalytics:
             end_date = date.today()
             start_date = end_date - timedelta(days=months * 31)
             excluded_ids = self._get_excluded_category_ids(session)
+            category_index = self._get_category_index(session)
             
             transactions = session.query(Transaction).filter(
                 Transaction.user_id == user_id,
@@ -1395,7 +1433,7 @@ class AdvancedAnalytics:
             day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
             
             for t in transactions:
-                cat = session.query(Category).filter_by(id=t.category_id).first()
+                cat = category_index.get(t.category_id)
                 cat_name = cat.name if cat else 'Uncategorized'
                 
                 if not self._is_actual_spending(t, cat_name, excluded_ids):
@@ -1546,6 +1584,8 @@ class AdvancedAnalytics:
             
             excluded_ids = self._get_excluded_category_ids(session)
             
+            category_index = self._get_category_index(session)
+            
             transactions = session.query(Transaction).filter(
                 Transaction.user_id == user_id,
                 Transaction.date >= month_start,
@@ -1560,7 +1600,7 @@ class AdvancedAnalytics:
             category_totals = defaultdict(lambda: {'total': 0, 'count': 0, 'group': 'Other'})
             
             for t in transactions:
-                cat = session.query(Category).filter_by(id=t.category_id).first()
+                cat = category_index.get(t.category_id)
                 cat_name = cat.name if cat else 'Uncategorized'
                 cat_group = cat.group if cat else 'Other'
                 
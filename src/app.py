@@ -17,6 +17,7 @@ from budget import BudgetManager
 from parsers.boa_parser import BoAParser
 from parsers.robinhood_parser import RobinhoodParser
 from parsers.venmo_parser import VenmoParser
+from parsers.budget_parser import BudgetParser
 import merchant_extractor
 from analytics_routes import analytics_bp
 from data_persistence import check_and_restore, export_data
@@ -45,6 +46,12 @@ dashboard_gen = DashboardGenerator()
 budget_manager = BudgetManager()
 categorizer = get_categorizer()
 
+# Parsers are stateless between calls, so share one instance of each
+boa_parser = BoAParser()
+robinhood_parser = RobinhoodParser()
+venmo_parser = VenmoParser()
+budget_parser = BudgetParser()
+
 # Register Jinja2 filters
 merchant_extractor.init_app(app)
 
@@ -512,7 +519,6 @@ def update_budget_item(item_id):
 @app.route('/api/budgets/import', methods=['POST'])
 def import_budget():
     """Import a budget from an Excel or CSV file."""
-    from parsers.budget_parser import BudgetParser
     from models import Budget, BudgetItem
     
     if 'file' not in request.files:
@@ -527,8 +533,7 @@ def import_budget():
     session = get_session()
     try:
         # Parse the budget file
-        parser = BudgetParser()
-        parsed = parser.parse_file_object(file, file.filename)
+        parsed = budget_parser.parse_file_object(file, file.filename)
         
         # Get existing categories
         categories = session.query(Category).filter_by(user_id=1).all()
@@ -542,47 +547,41 @@ def import_budget():
             is_active=True
         )
         session.add(budget)
-        session.commit()
         
-        # Process each budget item
-        items_created = 0
-        categories_created = 0
-        current_period = date.today().strftime('%Y-%m')
+        items = [item for item in parsed['all_items'] if item['amount'] > 0]
         
-        for item in parsed['all_items']:
-            if item['amount'] <= 0:
-                continue
-            
-            cat_name = item['category']
-            cat_lower = cat_name.lower()
-            
-            # Find or create category
-            if cat_lower in existing_cats:
-                category = existing_cats[cat_lower]
-            else:
-                # Create new category with the group from the budget
-                category = Category(
-                    name=cat_name,
+        # Create missing categories with the group from the budget
+        new_cats = {}
+        for item in items:
+            cat_lower = item['category'].lower()
+            if cat_lower not in existing_cats and cat_lower not in new_cats:
+                new_cats[cat_lower] = Category(
+                    name=item['category'],
                     group=item['group'],
                     user_id=1
                 )
-                session.add(category)
-                session.commit()
-                existing_cats[cat_lower] = category
-                categories_created += 1
-            
-            # Create budget item
-            budget_item = BudgetItem(
-                budget_id=budget.id,
-                category_id=category.id,
-                budgeted_amount=item['amount'],
-                period=current_period
-            )
-            session.add(budget_item)
-            items_created += 1
+        session.add_all(new_cats.values())
+        
+        # One flush assigns IDs to the budget and new categories
+        session.flush()
+        existing_cats.update(new_cats)
         
+        # Insert budget items without tracking ORM instances
+        current_period = date.today().strftime('%Y-%m')
+        session.bulk_insert_mappings(BudgetItem, [
+            {
+                'budget_id': budget.id,
+                'category_id': existing_cats[item['category'].lower()].id,
+                'budgeted_amount': item['amount'],
+                'period': current_period
+            }
+            for item in items
+        ])
         session.commit()
         
+        items_created = len(items)
+        categories_created = len(new_cats)
+        
         return jsonify({
             'success': True,
             'budget_id': budget.id,
@@ -604,7 +603,6 @@ def import_budget():
 @app.route('/api/budgets/preview', methods=['POST'])
 def preview_budget_import():
     """Preview a budget file before importing."""
-    from parsers.budget_parser import BudgetParser
     
     if 'file' not in request.files:
         return jsonify({'error': 'No file provided'}), 400
@@ -614,15 +612,20 @@ def preview_budget_import():
         return jsonify({'error': 'No file selected'}), 400
     
     try:
-        parser = BudgetParser()
-        parsed = parser.parse_file_object(file, file.filename)
-        
-        # Get existing categories for matching
+        parsed = budget_parser.parse_file_object(file, file.filename)
+
+        # Lowercase existing names in Python, as import_budget matches them;
+        # SQLite's lower() only folds ASCII
         session = get_session()
-        categories = session.query(Category).filter_by(user_id=1).all()
-        existing_cats = {c.name.lower() for c in categories}
-        session.close()
-        
+        try:
+            existing_cats = {
+                name.lower() for (name,) in session.query(Category.name).filter(
+                    Category.user_id == 1
+                )
+            }
+        finally:
+            session.close()
+
         # Add match status to each item
         for item in parsed['all_items']:
             item['exists'] = item['category'].lower() in existing_cats
@@ -805,9 +808,10 @@ def bulk_recategorize():
         # Get category mapping
         categories = {c.name: c.id for c in session.query(Category).filter_by(user_id=1).all()}
         
+        predictions = categorizer.predict_many([t.description for t in transactions])
+        
         updated = 0
-        for t in transactions:
-            predicted = categorizer.predict(t.description)
+        for t, predicted in zip(transactions, predictions):
             if predicted != 'Uncategorized' and predicted in categories:
                 t.category_id = categories[predicted]
                 updated += 1
@@ -826,6 +830,34 @@ def bulk_recategorize():
         session.close()
 
 
+# =============================================================================
+# API - Batch
+# =============================================================================
+
+@app.route('/api/batch', methods=['POST'])
+def batch_requests():
+    """Run several GET API requests in a single round trip."""
+    paths = request.get_json(silent=True)
+    if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+        return jsonify({'error': 'Expected a list of API paths'}), 400
+    
+    results = {}
+    for path in paths:
+        if not path.startswith('/api/') or path.startswith('/api/batch'):
+            results[path] = {'status': 400, 'data': {'error': 'Invalid path'}}
+            continue
+        
+        # Dispatch internally through the normal routing and error handling
+        with app.test_request_context(path, method='GET'):
+            response = app.full_dispatch_request()
+        results[path] = {
+            'status': response.status_code,
+            'data': response.get_json(silent=True)
+        }
+    
+    return jsonify(results)
+
+
 # =============================================================================
 # API - File Upload
 # =============================================================================
@@ -849,8 +881,7 @@ def upload_boa():
     file.save(filepath)
     
     try:
-        parser = BoAParser()
-        transactions = parser.parse_statement(filepath)
+        transactions = boa_parser.parse_statement(filepath)
         imported = _import_transactions(transactions)
         
         return jsonify({
@@ -883,8 +914,7 @@ def upload_robinhood():
     file.save(filepath)
     
     try:
-        parser = RobinhoodParser()
-        transactions = parser.parse_csv(filepath)
+        transactions = robinhood_parser.parse_csv(filepath)
         imported = _import_transactions(transactions)
         
         return jsonify({
@@ -917,8 +947,7 @@ def upload_venmo():
     file.save(filepath)
     
     try:
-        parser = VenmoParser()
-        transactions = parser.parse_csv(filepath)
+        transactions = venmo_parser.parse_csv(filepath)
         imported = _import_transactions(transactions)
         
         return jsonify({
@@ -943,9 +972,16 @@ def _import_transactions(transactions_data):
         categories = {c.name: c.id for c in session.query(Category).filter_by(user_id=1).all()}
         uncategorized_id = categories.get('Uncategorized', 1)
         
+        new_transactions = []
+        seen = set()
         for t_data in transactions_data:
-            # Check for duplicates
-            existing = session.query(Transaction).filter_by(
+            # Check for duplicates, including repeats within this file
+            key = (t_data['date'], t_data['description'], t_data['amount'])
+            if key in seen:
+                continue
+            seen.add(key)
+            
+            existing = session.query(Transaction.id).filter_by(
                 date=t_data['date'],
                 description=t_data['description'],
                 amount=t_data['amount'],
@@ -955,22 +991,28 @@ def _import_transactions(transactions_data):
             if existing:
                 continue
             
-            # Auto-categorize
-            predicted = categorizer.predict(t_data['description'])
-            category_id = categories.get(predicted, uncategorized_id)
-            
-            # Create transaction
-            transaction = Transaction(
-                user_id=1,
-                date=t_data['date'],
-                description=t_data['description'],
-                amount=t_data['amount'],
-                source=t_data.get('source'),
-                raw_category=t_data.get('raw_category'),
-                category_id=category_id
-            )
-            session.add(transaction)
-            imported_count += 1
+            new_transactions.append(t_data)
+        
+        # Auto-categorize in one batch
+        predictions = categorizer.predict_many([t['description'] for t in new_transactions])
+        
+        rows = [
+            {
+                'user_id': 1,
+                'date': t_data['date'],
+                'description': t_data['description'],
+                'merchant': merchant_extractor.extract_merchant_name(t_data['description']),
+                'amount': t_data['amount'],
+                'source': t_data.get('source'),
+                'raw_category': t_data.get('raw_category'),
+                'category_id': categories.get(predicted, uncategorized_id)
+            }
+            for t_data, predicted in zip(new_transactions, predictions)
+        ]
+        
+        # Insert without building ORM instances
+        session.bulk_insert_mappings(Transaction, rows)
+        imported_count = len(rows)
         
         session.commit()
         return imported_count
@@ -2,6 +2,9 @@
 Budget management functionality.
 """
 from datetime import date
+from operator import itemgetter
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 from models import get_session, Budget, BudgetItem, Category, Transaction
 
 
@@ -24,7 +27,9 @@ class BudgetManager:
         """Get a specific budget with items."""
         session = get_session()
         try:
-            budget = session.query(Budget).filter_by(
+            budget = session.query(Budget).options(
+                selectinload(Budget.items).selectinload(BudgetItem.category)
+            ).filter_by(
                 id=budget_id, user_id=self.user_id
             ).first()
             
@@ -69,25 +74,20 @@ class BudgetManager:
         try:
             # Calculate date range
             today = date.today()
-            start_date = date(today.year, today.month, 1)
-            for _ in range(months):
-                if start_date.month == 1:
-                    start_date = date(start_date.year - 1, 12, 1)
-                else:
-                    start_date = date(start_date.year, start_date.month - 1, 1)
-            
-            # Get category totals
-            transactions = session.query(Transaction).filter(
+            month_index = today.year * 12 + today.month - 1 - months
+            start_date = date(month_index // 12, month_index % 12 + 1, 1)
+            
+            # Get category totals, in order of first appearance
+            category_totals = dict(session.query(
+                Transaction.category_id,
+                func.sum(-Transaction.amount)
+            ).join(
+                Category, Transaction.category_id == Category.id
+            ).filter(
                 Transaction.user_id == self.user_id,
                 Transaction.date >= start_date,
                 Transaction.amount < 0
-            ).all()
-            
-            category_totals = {}
-            for t in transactions:
-                if t.category:
-                    cat_id = t.category_id
-                    category_totals[cat_id] = category_totals.get(cat_id, 0) + abs(t.amount)
+            ).group_by(Transaction.category_id).order_by(func.min(Transaction.id)).all())
             
             # Create budget
             budget = Budget(
@@ -97,20 +97,21 @@ class BudgetManager:
                 is_active=True
             )
             session.add(budget)
-            session.commit()
+            session.flush()
             
             # Create items from averages
             current_period = today.strftime('%Y-%m')
+            rows = []
             for cat_id, total in category_totals.items():
                 avg_amount = round(total / months, 2)
                 if avg_amount > 0:
-                    item = BudgetItem(
-                        budget_id=budget.id,
-                        category_id=cat_id,
-                        budgeted_amount=avg_amount,
-                        period=current_period
-                    )
-                    session.add(item)
+                    rows.append({
+                        'budget_id': budget.id,
+                        'category_id': cat_id,
+                        'budgeted_amount': avg_amount,
+                        'period': current_period
+                    })
+            session.bulk_insert_mappings(BudgetItem, rows)
             
             session.commit()
             return {'id': budget.id, 'name': budget.name}
@@ -124,7 +125,9 @@ class BudgetManager:
         
         session = get_session()
         try:
-            budget = session.query(Budget).filter_by(
+            budget = session.query(Budget).options(
+                selectinload(Budget.items).selectinload(BudgetItem.category)
+            ).filter_by(
                 id=budget_id, user_id=self.user_id
             ).first()
             
@@ -142,20 +145,20 @@ class BudgetManager:
             # Get actual spending by category
             # Note: Some transactions may have positive amounts (expenses) or negative (income)
             # We want all non-income transactions for budget tracking
-            transactions = session.query(Transaction).filter(
+            # Use absolute value to handle both positive and negative expense amounts
+            actual_by_category = dict(session.query(
+                Transaction.category_id,
+                func.sum(func.abs(Transaction.amount))
+            ).filter(
                 Transaction.user_id == self.user_id,
                 Transaction.date >= start_date,
                 Transaction.date < end_date
-            ).all()
-            
-            actual_by_category = {}
-            for t in transactions:
-                cat_id = t.category_id
-                # Use absolute value to handle both positive and negative expense amounts
-                actual_by_category[cat_id] = actual_by_category.get(cat_id, 0) + abs(t.amount)
+            ).group_by(Transaction.category_id).all())
             
             # Build status for each budget item
             items_status = []
+            total_budgeted = 0
+            total_actual = 0
             for item in budget.items:
                 if item.period != period:
                     continue
@@ -165,7 +168,7 @@ class BudgetManager:
                 variance = budgeted - actual
                 percent_used = (actual / budgeted * 100) if budgeted > 0 else 0
                 
-                items_status.append({
+                status = {
                     'id': item.id,
                     'category_id': item.category_id,
                     'category': item.category.name if item.category else 'Unknown',
@@ -173,17 +176,20 @@ class BudgetManager:
                     'actual': round(actual, 2),
                     'variance': round(variance, 2),
                     'percent_used': round(percent_used, 1)
-                })
+                }
+                items_status.append(status)
+                total_budgeted += status['budgeted']
+                total_actual += status['actual']
             
             # Sort by percent used descending
-            items_status.sort(key=lambda x: x['percent_used'], reverse=True)
+            items_status.sort(key=itemgetter('percent_used'), reverse=True)
             
             return {
                 'budget_name': budget.name,
                 'period': period,
                 'items': items_status,
-                'total_budgeted': sum(i['budgeted'] for i in items_status),
-                'total_actual': sum(i['actual'] for i in items_status)
+                'total_budgeted': total_budgeted,
+                'total_actual': total_actual
             }
         finally:
             session.close()
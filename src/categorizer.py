@@ -2,10 +2,25 @@
 ML-based transaction categorization using TF-IDF + Naive Bayes.
 """
 import os
-import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
+import json
+from functools import lru_cache
+import numpy as np
+from scipy.special import logsumexp
+from sklearn.base import clone
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import normalize
+from sklearn.utils import murmurhash3_32
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+# Manual corrections recorded by the app, used to (re)train the ML model
+TRAINING_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'training_data.json')
 
 
 class TransactionCategorizer:
@@ -14,23 +29,92 @@ class TransactionCategorizer:
     Uses rules for common patterns, ML for everything else.
     """
     
-    def __init__(self, model_path=None):
-        self.model_path = model_path or 'categorizer_model.joblib'
-        self.pipeline = None
-        self.is_trained = False
+    # Hashing avoids fitting and storing a vocabulary. The hash space is kept
+    # small because MultinomialNB stores dense per-class arrays of this width.
+    HASHING_PARAMS = {
+        'lowercase': True,
+        'n_features': 2 ** 13,
+        'ngram_range': (1, 2),
+        'stop_words': 'english',
+        'alternate_sign': False,
+        'norm': None
+    }
+    
+    def __init__(self, model_path=None, rules_only=False):
+        self.model_path = model_path or 'categorizer_model.npy'
+        self.meta_path = os.path.splitext(self.model_path)[0] + '.json'
+        self.rules_only = rules_only
+        self._classes = None
+        self._model_loaded = False
         self.rule_categorizer = RuleBasedCategorizer()
         
-        # Try to load existing model
-        self._load_model()
+        # How often the cheap rules answer before the ML model is needed
+        self.stats = {'rule_hits': 0, 'ml_hits': 0}
+        
+        # Descriptions repeat heavily, so memoize per instance until retrained
+        self._predict_cached = lru_cache(maxsize=16384)(self._predict)
+        self._predict_with_confidence_cached = lru_cache(maxsize=16384)(
+            self._predict_with_confidence
+        )
+    
+    @property
+    def is_trained(self):
+        """Whether a trained ML model is available, loading it on first use."""
+        if self.rules_only:
+            return False
+        if not self._model_loaded:
+            self._load_model()
+        return self._classes is not None
     
     def _load_model(self):
-        """Load trained model from disk if exists."""
-        if os.path.exists(self.model_path):
-            try:
-                self.pipeline = joblib.load(self.model_path)
-                self.is_trained = True
-            except Exception:
-                self.is_trained = False
+        """
+        Load the trained model from disk, or train one from the recorded
+        corrections if none has been saved yet.
+        
+        The model is a .npy of class log-probs (memory-mapped rather than copied
+        into the process) plus a JSON sidecar with everything else.
+        """
+        self._model_loaded = True
+        if not (os.path.exists(self.model_path) and os.path.exists(self.meta_path)):
+            # No saved model yet (fresh install, or an older joblib model): train
+            # from the recorded corrections instead of waiting for the next 50
+            self.train_from_file()
+            return
+        
+        try:
+            with open(self.meta_path, 'r') as f:
+                meta = json.load(f)
+            
+            hashing_params = dict(meta['hashing'])
+            hashing_params['ngram_range'] = tuple(hashing_params['ngram_range'])
+            
+            self._set_model_params(
+                HashingVectorizer(**hashing_params),
+                np.array(meta['idf']),
+                np.load(self.model_path, mmap_mode='r'),
+                np.array(meta['class_log_prior']),
+                np.array(meta['classes'])
+            )
+        except Exception:
+            self._classes = None
+
+    def _save_model(self):
+        """Save model arrays and metadata to disk."""
+        meta = {
+            'hashing': self.HASHING_PARAMS,
+            'idf': self._idf.tolist(),
+            'class_log_prior': self._class_log_prior.tolist(),
+            'classes': self._classes.tolist()
+        }
+        
+        # Write via temp files, so a memory-mapped older model is never
+        # truncated underneath a running prediction
+        with open(self.model_path + '.tmp', 'wb') as f:
+            np.save(f, self._feature_log_prob_t)
+        with open(self.meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(self.model_path + '.tmp', self.model_path)
+        os.replace(self.meta_path + '.tmp', self.meta_path)
     
     def train(self, descriptions, categories):
         """
@@ -40,58 +124,379 @@ class TransactionCategorizer:
             descriptions: List of transaction descriptions
             categories: List of corresponding category names
         """
-        if len(descriptions) < 10:
+        if self.rules_only or len(descriptions) < 10:
             return False
         
-        self.pipeline = Pipeline([
-            ('tfidf', TfidfVectorizer(
-                lowercase=True,
-                max_features=5000,
-                ngram_range=(1, 2),
-                stop_words='english'
-            )),
+        pipeline = Pipeline([
+            ('hashing', HashingVectorizer(**self.HASHING_PARAMS)),
+            ('tfidf', TfidfTransformer()),
             ('classifier', MultinomialNB(alpha=0.1))
         ])
+        pipeline.fit(descriptions, categories)
         
-        self.pipeline.fit(descriptions, categories)
-        self.is_trained = True
+        hashing, tfidf, classifier = (step for _, step in pipeline.steps)
+        self._set_model_params(
+            hashing,
+            tfidf.idf_,
+            # Keep one contiguous row of class log-probs per feature so scoring a
+            # description gathers just the rows for its hashed tokens
+            np.ascontiguousarray(classifier.feature_log_prob_.T),
+            classifier.class_log_prior_,
+            classifier.classes_
+        )
+        self._model_loaded = True
+        self._predict_cached.cache_clear()
+        self._predict_with_confidence_cached.cache_clear()
         
         # Save model
-        joblib.dump(self.pipeline, self.model_path)
+        self._save_model()
         return True
     
+    def train_from_file(self, path=TRAINING_DATA_PATH):
+        """Train the ML model from a JSON list of description/category samples."""
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'r') as f:
+                samples = json.load(f)
+        except (OSError, ValueError):
+            return False
+        
+        return self.train(
+            [s['description'] for s in samples],
+            [s['category'] for s in samples]
+        )
+    
+    def _set_model_params(self, vectorizer, idf, feature_log_prob_t, class_log_prior, classes):
+        """Store the fitted parameters used for direct Naive Bayes scoring."""
+        # Callers lowercase descriptions once and share them with the rule
+        # path, so the vectorizer used for scoring skips its own lowercasing
+        self._vectorizer = clone(vectorizer).set_params(lowercase=False)
+        self._analyzer = self._vectorizer.build_analyzer()
+        self._n_features = vectorizer.n_features
+        self._idf = idf
+        self._feature_log_prob_t = feature_log_prob_t
+        self._class_log_prior = class_log_prior
+        self._classes = classes
+    
+    def _joint_log_likelihood(self, descriptions):
+        """Score lowercased descriptions against every class without sklearn's predict overhead."""
+        X = self._vectorizer.transform(descriptions)
+        # TF-IDF weighting and l2 normalization, as TfidfTransformer does
+        X = normalize(X.multiply(self._idf).tocsr())
+        return np.asarray(X @ self._feature_log_prob_t) + self._class_log_prior
+    
+    def _score_one(self, description):
+        """
+        Score a single lowercased description without building a sparse matrix.
+        
+        Hashes tokens the same way HashingVectorizer does, then gathers just
+        those rows of the class log-prob table.
+        """
+        tokens = self._analyzer(description)
+        if not tokens:
+            return self._class_log_prior
+        
+        indices = np.fromiter(
+            (self._hash_index(token) for token in tokens),
+            dtype=np.intp, count=len(tokens)
+        )
+        indices, counts = np.unique(indices, return_counts=True)
+        
+        # TF-IDF weighting and l2 normalization, as TfidfTransformer does
+        weights = counts * self._idf[indices]
+        weights /= np.sqrt(weights @ weights)
+        return self._class_log_prior + weights @ self._feature_log_prob_t[indices]
+    
+    def _hash_index(self, token):
+        """Column index HashingVectorizer assigns to a token."""
+        h = murmurhash3_32(token, seed=0)
+        if h == -2147483648:
+            return (2147483647 - (self._n_features - 1)) % self._n_features
+        return abs(h) % self._n_features
+    
     def predict(self, description):
         """
         Predict category for a transaction description.
         Uses rules first, falls back to ML if trained.
         """
+        category, source = self._predict_cached(description)
+        self._count_hit(source)
+        return category
+    
+    def _predict(self, description):
+        """Uncached body of predict(), returning (category, source)."""
+        category, source, _ = self._predict_internal(description)
+        return category, source
+    
+    def _count_hit(self, source):
+        """Record which path answered a prediction, cached or not."""
+        if source == 'rule':
+            self.stats['rule_hits'] += 1
+        elif source == 'ml':
+            self.stats['ml_hits'] += 1
+    
+    def _predict_internal(self, description):
+        """
+        Run the rule and ML paths once for a description.
+        
+        Returns (category, source, scores) where source is 'rule', 'ml' or
+        'none', and scores are the ML class scores when the ML path ran.
+        """
+        desc_lower = description.lower()
+        
         # Try rule-based first
-        rule_prediction = self.rule_categorizer.predict(description)
+        rule_prediction = self.rule_categorizer.predict_lowered(desc_lower)
         if rule_prediction != 'Uncategorized':
-            return rule_prediction
+            return rule_prediction, 'rule', None
         
         # Try ML if trained
-        if self.is_trained and self.pipeline:
+        if self.is_trained:
             try:
-                return self.pipeline.predict([description])[0]
+                jll = self._score_one(desc_lower)
+                return self._classes[jll.argmax()], 'ml', jll
             except Exception:
                 pass
         
-        return 'Uncategorized'
+        return 'Uncategorized', 'none', None
+    
+    def predict_many(self, descriptions):
+        """
+        Predict categories for a list of descriptions.
+        
+        Rules are applied per description; everything the rules miss goes
+        through the ML pipeline in a single batch call.
+        """
+        lowered = [d.lower() for d in descriptions]
+        predictions = [self.rule_categorizer.predict_lowered(d) for d in lowered]
+        missed = [i for i, p in enumerate(predictions) if p == 'Uncategorized']
+        self.stats['rule_hits'] += len(predictions) - len(missed)
+        
+        if missed and self.is_trained:
+            try:
+                jll = self._joint_log_likelihood([lowered[i] for i in missed])
+                ml_predictions = self._classes[jll.argmax(axis=1)]
+                for i, predicted in zip(missed, ml_predictions):
+                    predictions[i] = predicted
+                self.stats['ml_hits'] += len(missed)
+            except Exception:
+                pass
+        
+        return predictions
     
     def predict_with_confidence(self, description):
         """Predict category with confidence score."""
-        category = self.predict(description)
-        confidence = 0.9 if self.rule_categorizer.predict(description) != 'Uncategorized' else 0.7
+        category, confidence, source = self._predict_with_confidence_cached(description)
+        self._count_hit(source)
+        return category, confidence
+    
+    def _predict_with_confidence(self, description):
+        """Uncached body of predict_with_confidence(), returning (category, confidence, source)."""
+        category, source, jll = self._predict_internal(description)
+        confidence = 0.9 if source == 'rule' else 0.7
         
-        if self.is_trained and self.pipeline:
+        # A trained model's top-class probability wins, even for rule matches
+        if self.is_trained:
             try:
-                proba = self.pipeline.predict_proba([description])[0]
-                confidence = max(proba)
+                if jll is None:
+                    jll = self._score_one(description.lower())
+                # Top-class probability from log-space scores, without normalizing every class
+                confidence = float(np.exp(jll.max() - logsumexp(jll)))
             except Exception:
                 pass
         
-        return category, confidence
+        return category, confidence, source
+
+
+# Keyword rules, checked in order; the first matching category wins
+_RULES = {
+    'Income': [
+        'dir dep', 'direct dep', 'payroll', 'salary', 'paycheck',
+        'ach credit', 'deposit'
+    ],
+    
+    'Coffee': [
+        'starbucks', 'coffee', 'dunkin', 'peets', 'blue bottle',
+        'la colombe', 'houndstooth'
+    ],
+    
+    'Groceries': [
+        'h-e-b', 'heb', 'whole foods', 'trader joe', 'grocery',
+        'central market', 'kroger', 'safeway', 'publix', 'costco'
+    ],
+    
+    'Eating Out': [
+        'doordash', 'uber eats', 'grubhub', 'postmates',
+        'tst*', 'sq *', 'restaurant', 'cafe', 'diner', 'grill',
+        'kitchen', 'taco', 'pizza', 'burger', 'sushi', 'thai',
+        'chinese', 'mexican', 'chipotle', 'panera'
+    ],
+    
+    'Uber/Lyft': [
+        'uber *trip', 'uber trip', 'lyft', 'lime*ride'
+    ],
+    
+    'Subscriptions': [
+        'netflix', 'spotify', 'hulu', 'amazon prime',
+        'apple.com/bill', 'disney+', 'hbo', 'youtube premium',
+        'microsoft*ultimate', 'subscription', 'canva', 'perplexity',
+        'ouraring', 'tonal', 'uber *one membership', 'substack'
+    ],
+    
+    'Utilities': [
+        'city of austin', 'electric', 'water bill', 'utility',
+        'comcast', 'spectrum', 'xfinity', 'one gas', 'atmos'
+    ],
+    
+    'Rent': [
+        'rent', 'apartment', 'lease', 'property mgmt', 'greystar', 'pay ready'
+    ],
+    
+    'Investments': [
+        'fid bkg svc', 'moneyline', 'fidelity', 'vanguard',
+        'schwab', 'acorns', 'etrade', 'td ameritrade', 'robinhood des:funds'
+    ],
+    
+    'Credit Card Payment': [
+        'chase credit crd', 'discover', 'capital one', 'amex',
+        'credit card payment', 'cc payment'
+    ],
+    
+    'Venmo': ['venmo'],
+    'PayPal': ['paypal'],
+    
+    'Shopping': [
+        'amazon', 'target', 'walmart', 'best buy', 'home depot',
+        'lowes', 'ikea', 'amz*', 'wayfair', 'dsw', 'old navy',
+        'nike', 'cuts clothing', 'chewy', 'lindt'
+    ],
+    
+    'Gas': [
+        'shell', 'chevron', 'exxon', 'gas station', 'fuel',
+        'bp ', 'mobil', 'valero', 'texaco', 'qt ', '7-eleven'
+    ],
+    
+    'Tolls': ['hctra', 'ez tag', 'toll'],
+    
+    'Healthcare': [
+        'pharmacy', 'cvs', 'walgreens', 'doctor', 'medical',
+        'hospital', 'clinic', 'dental'
+    ],
+    
+    'Entertainment': [
+        'movie', 'theater', 'concert', 'ticket', 'amc',
+        'nintendo', 'playstation', 'xbox', 'steam'
+    ],
+    
+    'Transfer': [
+        'transfer', 'zelle'
+    ],
+    
+    'Wire Transfer': [
+        'wire type:', 'wire transfer'
+    ],
+    
+    'ATM': [
+        'atm', 'withdrwl', 'withdrawal', 'bkofamerica atm'
+    ],
+    
+    'Robinhood CC': [
+        'robinhood card des:payment'
+    ],
+    
+    'Chase CC': [
+        'chase credit crd'
+    ],
+    
+    'Loan Payment': [
+        'upgrade, inc', 'sst ', 'loan pmt', 'tally'
+    ],
+    
+    'Mortgage': [
+        'truist mortg', 'mortgage', 'mtgpmt'
+    ],
+    
+    'Phone/Internet': [
+        'att des:payment', 'at&t', 't-mobile', 'sprint', 'comcast'
+    ],
+    
+    'Natural Gas': [
+        'one gas', 'atmos energy', 'centerpoint'
+    ],
+    
+    'Alcohol': [
+        'little woodrow', 'bar', 'pub', 'liquor', 'beer', 'wine'
+    ],
+    
+    'Gym': [
+        'ymca', 'gym', 'fitness', 'planet fitness', 'equinox'
+    ],
+    
+    'Travel': [
+        'airline', 'southwest', 'delta', 'united', 'american air',
+        'hotel', 'airbnb', 'marriott', 'hilton', 'hyatt', 'jetblue',
+        'air canada', 'wifionboard', 'swa inflight', 'duty free',
+        'ristorante', 'venezia', 'zurich', 'milano'
+    ],
+    
+    'Travel Food': [
+        'airport-f&b', 'airport food', 'hudson news', 'minute suites',
+        'jfk ', 'lax ', 'aus ', 'sdx aus', 'tim hortons'
+    ],
+    
+    'Transportation': [
+        'mta*nyct', 'metro', 'transit', 'subway'
+    ],
+    
+    'Auto': [
+        'wells fargo auto', 'auto loan', 'car payment', 'daves ultimate auto'
+    ],
+    
+    'Pest Control': [
+        'hawx pest', 'pest control', 'terminix', 'orkin'
+    ],
+    
+    'Hair/Beauty': [
+        'salon', 'barber', 'haircut', 'black orchid'
+    ],
+    
+    'Golf': [
+        'harveypenick', 'golf', 'glf*', 'topgolf'
+    ],
+    
+    'Gambling': [
+        'draftkings', 'fanduel', 'bet365', 'caesars sports'
+    ],
+    
+    'CC Payment': [
+        'payment - thank you', 'payment thank you'
+    ],
+}
+
+
+def _build_automaton(rules):
+    """Build an Aho-Corasick automaton mapping keyword -> (priority, category, length)."""
+    automaton = ahocorasick.Automaton()
+    for priority, (category, keywords) in enumerate(rules.items()):
+        for keyword in keywords:
+            # Keep the earliest category when a keyword appears twice
+            if not automaton.exists(keyword):
+                automaton.add_word(keyword, (priority, category, len(keyword)))
+    automaton.make_automaton()
+    return automaton
+
+
+def _build_keyword_table(rules):
+    """Flatten rules into (keyword, category, priority) in rule order for the fallback scan."""
+    return [
+        (keyword, category, priority)
+        for priority, (category, keywords) in enumerate(rules.items())
+        for keyword in keywords
+    ]
+
+
+_RULE_AUTOMATON = _build_automaton(_RULES) if ahocorasick else None
+_RULE_KEYWORD_TABLE = _build_keyword_table(_RULES)
 
 
 class RuleBasedCategorizer:
@@ -100,177 +505,55 @@ class RuleBasedCategorizer:
     Fast and reliable for common transaction patterns.
     """
     
-    def __init__(self):
-        self.rules = {
-            'Income': [
-                'dir dep', 'direct dep', 'payroll', 'salary', 'paycheck',
-                'ach credit', 'deposit'
-            ],
-            
-            'Coffee': [
-                'starbucks', 'coffee', 'dunkin', 'peets', 'blue bottle',
-                'la colombe', 'houndstooth'
-            ],
-            
-            'Groceries': [
-                'h-e-b', 'heb', 'whole foods', 'trader joe', 'grocery',
-                'central market', 'kroger', 'safeway', 'publix', 'costco'
-            ],
-            
-            'Eating Out': [
-                'doordash', 'uber eats', 'grubhub', 'postmates',
-                'tst*', 'sq *', 'restaurant', 'cafe', 'diner', 'grill',
-                'kitchen', 'taco', 'pizza', 'burger', 'sushi', 'thai',
-                'chinese', 'mexican', 'chipotle', 'panera'
-            ],
-            
-            'Uber/Lyft': [
-                'uber *trip', 'uber trip', 'lyft', 'lime*ride'
-            ],
-            
-            'Subscriptions': [
-                'netflix', 'spotify', 'hulu', 'amazon prime',
-                'apple.com/bill', 'disney+', 'hbo', 'youtube premium',
-                'microsoft*ultimate', 'subscription', 'canva', 'perplexity',
-                'ouraring', 'tonal', 'uber *one membership', 'substack'
-            ],
-            
-            'Utilities': [
-                'city of austin', 'electric', 'water bill', 'utility',
-                'comcast', 'spectrum', 'xfinity', 'one gas', 'atmos'
-            ],
-            
-            'Rent': [
-                'rent', 'apartment', 'lease', 'property mgmt', 'greystar', 'pay ready'
-            ],
-            
-            'Investments': [
-                'fid bkg svc', 'moneyline', 'fidelity', 'vanguard',
-                'schwab', 'acorns', 'etrade', 'td ameritrade', 'robinhood des:funds'
-            ],
-            
-            'Credit Card Payment': [
-                'chase credit crd', 'discover', 'capital one', 'amex',
-                'credit card payment', 'cc payment'
-            ],
-            
-            'Venmo': ['venmo'],
-            'PayPal': ['paypal'],
-            
-            'Shopping': [
-                'amazon', 'target', 'walmart', 'best buy', 'home depot',
-                'lowes', 'ikea', 'amz*', 'wayfair', 'dsw', 'old navy',
-                'nike', 'cuts clothing', 'chewy', 'lindt'
-            ],
-            
-            'Gas': [
-                'shell', 'chevron', 'exxon', 'gas station', 'fuel',
-                'bp ', 'mobil', 'valero', 'texaco', 'qt ', '7-eleven'
-            ],
-            
-            'Tolls': ['hctra', 'ez tag', 'toll'],
-            
-            'Healthcare': [
-                'pharmacy', 'cvs', 'walgreens', 'doctor', 'medical',
-                'hospital', 'clinic', 'dental'
-            ],
-            
-            'Entertainment': [
-                'movie', 'theater', 'concert', 'ticket', 'amc',
-                'nintendo', 'playstation', 'xbox', 'steam'
-            ],
-            
-            'Transfer': [
-                'transfer', 'zelle'
-            ],
-            
-            'Wire Transfer': [
-                'wire type:', 'wire transfer'
-            ],
-            
-            'ATM': [
-                'atm', 'withdrwl', 'withdrawal', 'bkofamerica atm'
-            ],
-            
-            'Robinhood CC': [
-                'robinhood card des:payment'
-            ],
-            
-            'Chase CC': [
-                'chase credit crd'
-            ],
-            
-            'Loan Payment': [
-                'upgrade, inc', 'sst ', 'loan pmt', 'tally'
-            ],
-            
-            'Mortgage': [
-                'truist mortg', 'mortgage', 'mtgpmt'
-            ],
-            
-            'Phone/Internet': [
-                'att des:payment', 'at&t', 't-mobile', 'sprint', 'comcast'
-            ],
-            
-            'Natural Gas': [
-                'one gas', 'atmos energy', 'centerpoint'
-            ],
-            
-            'Alcohol': [
-                'little woodrow', 'bar', 'pub', 'liquor', 'beer', 'wine'
-            ],
-            
-            'Gym': [
-                'ymca', 'gym', 'fitness', 'planet fitness', 'equinox'
-            ],
-            
-            'Travel': [
-                'airline', 'southwest', 'delta', 'united', 'american air',
-                'hotel', 'airbnb', 'marriott', 'hilton', 'hyatt', 'jetblue',
-                'air canada', 'wifionboard', 'swa inflight', 'duty free',
-                'ristorante', 'venezia', 'zurich', 'milano'
-            ],
-            
-            'Travel Food': [
-                'airport-f&b', 'airport food', 'hudson news', 'minute suites',
-                'jfk ', 'lax ', 'aus ', 'sdx aus', 'tim hortons'
-            ],
-            
-            'Transportation': [
-                'mta*nyct', 'metro', 'transit', 'subway'
-            ],
-            
-            'Auto': [
-                'wells fargo auto', 'auto loan', 'car payment', 'daves ultimate auto'
-            ],
-            
-            'Pest Control': [
-                'hawx pest', 'pest control', 'terminix', 'orkin'
-            ],
-            
-            'Hair/Beauty': [
-                'salon', 'barber', 'haircut', 'black orchid'
-            ],
-            
-            'Golf': [
-                'harveypenick', 'golf', 'glf*', 'topgolf'
-            ],
-            
-            'Gambling': [
-                'draftkings', 'fanduel', 'bet365', 'caesars sports'
-            ],
-            
-            'CC Payment': [
-                'payment - thank you', 'payment thank you'
-            ],
-        }
+    def __init__(self, match='priority'):
+        """
+        Args:
+            match: 'priority' picks the earliest matching category in rule
+                order; 'first' picks the keyword that starts earliest in the
+                description, breaking ties by rule order
+        """
+        if match not in ('priority', 'first'):
+            raise ValueError(f"Unknown match mode: {match}")
+        self.match = match
+        
+        # Built once per process at import and shared by every instance
+        self.rules = _RULES
+        self._automaton = _RULE_AUTOMATON
+        self._keyword_table = _RULE_KEYWORD_TABLE
     
     def predict(self, description):
         """Predict category based on keyword rules."""
-        desc_lower = description.lower()
+        return self.predict_lowered(description.lower())
+    
+    def predict_lowered(self, desc_lower):
+        """Predict category for a description that is already lowercased."""
+        if self._automaton is not None:
+            # One pass finds every keyword hit; rank them by the match mode
+            best_key = None
+            best_category = 'Uncategorized'
+            for end, (priority, category, length) in self._automaton.iter(desc_lower):
+                if self.match == 'first':
+                    key = (end - length + 1, priority)
+                else:
+                    key = priority
+                if best_key is None or key < best_key:
+                    best_key = key
+                    best_category = category
+            return best_category
+        
+        if self.match == 'first':
+            best_key = None
+            best_category = 'Uncategorized'
+            for keyword, category, priority in self._keyword_table:
+                start = desc_lower.find(keyword)
+                if start >= 0 and (best_key is None or (start, priority) < best_key):
+                    best_key = (start, priority)
+                    best_category = category
+            return best_category
         
-        for category, keywords in self.rules.items():
-            if any(keyword in desc_lower for keyword in keywords):
+        # Rules are checked in order, so the earliest matching category wins
+        for keyword, category, _ in self._keyword_table:
+            if keyword in desc_lower:
                 return category
         
         return 'Uncategorized'
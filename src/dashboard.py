@@ -1,16 +1,51 @@
 """
 Dashboard data generation and analytics.
 """
+import re
+from collections import OrderedDict, defaultdict
 from datetime import date, timedelta
-from sqlalchemy import func, extract
-from models import get_session, Transaction, Category
+from threading import Lock
+from sqlalchemy import func, case, and_, or_
+from models import get_session, get_data_version, Transaction, Category, MonthlyCategoryTotal
+
+
+# Month names indexed by month number (1-12)
+MONTH_NAMES = ('', 'January', 'February', 'March', 'April', 'May', 'June', 'July',
+               'August', 'September', 'October', 'November', 'December')
+MONTH_ABBRS = ('', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
 
 
 class DashboardGenerator:
     """Generate dashboard analytics data."""
     
     # Categories to exclude from expense calculations (to prevent double-counting)
-    EXCLUDED_CATEGORIES = ['Credit Card Payment', 'Transfer', 'CC Payment']
+    EXCLUDED_CATEGORIES = frozenset(['Credit Card Payment', 'Transfer', 'CC Payment'])
+    
+    # Number of computed results kept by the result cache
+    RESULT_CACHE_SIZE = 64
+    
+    def __init__(self):
+        # (data version, excluded category IDs), refreshed after any commit
+        self._excluded_cache = (None, frozenset())
+        
+        # Computed results keyed by arguments and data version, least recently used first
+        self._result_cache = OrderedDict()
+        self._result_cache_lock = Lock()
+    
+    def _cached(self, key, compute):
+        """Return a cached result for key, computing it if the data has changed."""
+        key = key + (get_data_version(),)
+        with self._result_cache_lock:
+            if key in self._result_cache:
+                self._result_cache.move_to_end(key)
+                return self._result_cache[key]
+        
+        result = compute()
+        with self._result_cache_lock:
+            self._result_cache[key] = result
+            if len(self._result_cache) > self.RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+        return result
     
     def get_dashboard_data(self, year, month, user_id=1):
         """
@@ -18,6 +53,13 @@ class DashboardGenerator:
         
         Returns dict with summary, category breakdown, and chart data.
         """
+        return self._cached(
+            ('dashboard', user_id, year, month),
+            lambda: self._build_dashboard_data(year, month, user_id)
+        )
+    
+    def _build_dashboard_data(self, year, month, user_id):
+        """Compute dashboard data for a given month."""
         session = get_session()
         
         try:
@@ -28,30 +70,42 @@ class DashboardGenerator:
             else:
                 end_date = date(year, month + 1, 1)
             
-            # Get transactions for the month
-            transactions = session.query(Transaction).filter(
+            # Get previous month
+            if month == 1:
+                prev_year, prev_month = year - 1, 12
+            else:
+                prev_year, prev_month = year, month - 1
+            prev_start = date(prev_year, prev_month, 1)
+            
+            month_filter = and_(
                 Transaction.user_id == user_id,
                 Transaction.date >= start_date,
                 Transaction.date < end_date
-            ).all()
+            )
+            excluded_ids = self._get_excluded_category_ids(session)
+            
+            # Sum the current and previous month in one pass
+            current_totals, prev_totals = self._get_month_totals(
+                session, user_id, prev_start, start_date, end_date, excluded_ids
+            )
             
             # Calculate summary
-            summary = self._calculate_summary(transactions, session)
+            summary = self._calculate_summary(current_totals)
             
             # Get category breakdown
-            by_category = self._get_category_breakdown(transactions, session)
+            by_category = self._get_category_breakdown(current_totals['by_category'])
             
             # Get category group breakdown
-            by_group = self._get_group_breakdown(transactions, session)
+            by_group = self._get_group_breakdown(current_totals['by_group'])
             
-            # Get top merchants
-            top_merchants = self._get_top_merchants(transactions)
+            # Get top merchants, skipping the query for a month with no transactions
+            top_merchants = self._get_top_merchants(session, month_filter) if current_totals['count'] else []
             
             # Get spending trends (last 6 months)
-            trends = self._get_spending_trends(user_id, year, month)
+            trends = self._get_spending_trends(user_id, year, month, session=session)
             
             # Get previous month comparison data
-            prev_month_data = self._get_previous_month_comparison(user_id, year, month, session)
+            prev_month_data = self._get_previous_month_comparison(prev_year, prev_month, prev_totals)
             
             # Generate quick insights
             insights = self._generate_quick_insights(summary, prev_month_data, by_category, top_merchants)
@@ -70,16 +124,67 @@ class DashboardGenerator:
         finally:
             session.close()
     
-    def _calculate_summary(self, transactions, session):
-        """Calculate summary statistics."""
-        income = sum(t.amount for t in transactions if t.amount > 0)
-        
-        # Exclude credit card payments from expenses
-        excluded_ids = self._get_excluded_category_ids(session)
-        expenses = sum(
-            abs(t.amount) for t in transactions 
-            if t.amount < 0 and t.category_id not in excluded_ids
+    def _counted_expense(self, excluded_ids):
+        """SQL condition for expenses that count toward spending totals."""
+        # Uncategorized rows have a NULL category_id, which NOT IN would drop
+        return and_(
+            Transaction.amount < 0,
+            or_(
+                Transaction.category_id.is_(None),
+                ~Transaction.category_id.in_(excluded_ids)
+            )
         )
+    
+    def _get_month_totals(self, session, user_id, prev_start, start_date, end_date, excluded_ids):
+        """
+        Sum income, counted expenses and per-category and per-group expenses
+        for two adjacent months.
+        
+        Returns (current, previous) totals dicts.
+        """
+        counted = self._counted_expense(excluded_ids)
+        cat_name = func.coalesce(Category.name, 'Uncategorized')
+        is_current = (Transaction.date >= start_date).label('is_current')
+        rows = session.query(
+            is_current,
+            cat_name,
+            Category.group,
+            func.sum(case((Transaction.amount > 0, Transaction.amount), else_=0)),
+            func.sum(case((counted, -Transaction.amount), else_=0)),
+            func.sum(case((counted, 1), else_=0)),
+            func.count(Transaction.id)
+        ).outerjoin(
+            Category, Transaction.category_id == Category.id
+        ).filter(
+            Transaction.user_id == user_id,
+            Transaction.date >= prev_start,
+            Transaction.date < end_date
+        ).group_by(is_current, cat_name, Category.group).all()
+        
+        totals = {
+            bucket: {'income': 0, 'expenses': 0, 'count': 0, 'by_category': {}, 'by_group': {}}
+            for bucket in (True, False)
+        }
+        for current, name, group, income, expenses, expense_count, count in rows:
+            month_totals = totals[bool(current)]
+            month_totals['income'] += income
+            month_totals['expenses'] += expenses
+            month_totals['count'] += count
+            if expense_count:
+                by_category = month_totals['by_category']
+                by_category[name] = by_category.get(name, 0) + expenses
+                
+                # Transactions without a category have no group and are left out
+                if group is not None and name != 'Uncategorized':
+                    by_group = month_totals['by_group']
+                    by_group[group] = by_group.get(group, 0) + expenses
+        
+        return totals[True], totals[False]
+    
+    def _calculate_summary(self, month_totals):
+        """Calculate summary statistics."""
+        income = month_totals['income']
+        expenses = month_totals['expenses']
         
         net = income - expenses
         savings_rate = (net / income * 100) if income > 0 else 0
@@ -89,28 +194,24 @@ class DashboardGenerator:
             'expenses': round(expenses, 2),
             'net': round(net, 2),
             'savings_rate': round(savings_rate, 1),
-            'transaction_count': len(transactions)
+            'transaction_count': month_totals['count']
         }
     
     def _get_excluded_category_ids(self, session):
         """Get IDs of categories to exclude from expense calculations."""
-        categories = session.query(Category).filter(
-            Category.name.in_(self.EXCLUDED_CATEGORIES)
-        ).all()
-        return {c.id for c in categories}
+        version = get_data_version()
+        cached_version, excluded_ids = self._excluded_cache
+        if cached_version != version:
+            excluded_ids = frozenset(
+                category_id for (category_id,) in session.query(Category.id).filter(
+                    Category.name.in_(self.EXCLUDED_CATEGORIES)
+                )
+            )
+            self._excluded_cache = (version, excluded_ids)
+        return excluded_ids
     
-    def _get_category_breakdown(self, transactions, session):
+    def _get_category_breakdown(self, category_totals):
         """Get spending breakdown by category."""
-        excluded_ids = self._get_excluded_category_ids(session)
-        
-        category_totals = {}
-        for t in transactions:
-            if t.amount >= 0 or t.category_id in excluded_ids:
-                continue
-            
-            cat_name = t.category.name if t.category else 'Uncategorized'
-            category_totals[cat_name] = category_totals.get(cat_name, 0) + abs(t.amount)
-        
         # Sort by amount descending
         sorted_cats = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
         
@@ -123,38 +224,23 @@ class DashboardGenerator:
     ]
     
     # Groups to exclude from lifestyle chart (money movements, not expenses)
-    EXCLUDED_GROUPS = ['Financial', 'Transfer', 'Cash', 'Income', 'Other', 'Credit Cards']
+    EXCLUDED_GROUPS = frozenset(['Financial', 'Transfer', 'Cash', 'Income', 'Other', 'Credit Cards'])
     
-    def _get_group_breakdown(self, transactions, session):
+    def _get_group_breakdown(self, expenses_by_group):
         """Get spending breakdown by category group, focused on lifestyle expenses."""
-        excluded_ids = self._get_excluded_category_ids(session)
-        
-        # Exclude Uncategorized
-        uncategorized = session.query(Category).filter_by(name='Uncategorized').first()
-        uncategorized_id = uncategorized.id if uncategorized else None
-        
         group_totals = {g: 0 for g in self.KEY_GROUPS}
         group_totals['Shopping'] = 0  # Include shopping as lifestyle expense
         group_totals['Entertainment'] = 0
         group_totals['Travel'] = 0
         
-        for t in transactions:
-            if t.amount >= 0 or t.category_id in excluded_ids:
-                continue
-            
-            # Skip uncategorized
-            if t.category_id == uncategorized_id:
-                continue
-            
-            group_name = t.category.group if t.category else 'Other'
-            
+        for group_name, amount in expenses_by_group.items():
             # Skip excluded groups (financial transactions)
             if group_name in self.EXCLUDED_GROUPS:
                 continue
             
             # Map to key groups
             if group_name in group_totals:
-                group_totals[group_name] += abs(t.amount)
+                group_totals[group_name] += amount
         
         # Sort by amount descending, filter out zero amounts
         sorted_groups = sorted(
@@ -165,31 +251,52 @@ class DashboardGenerator:
         
         return [{'name': name, 'amount': round(amt, 2)} for name, amt in sorted_groups]
     
-    def _get_top_merchants(self, transactions, limit=10):
+    def _get_top_merchants(self, session, transaction_filter, limit=10):
         """Get top merchants by spending."""
-        from merchant_extractor import extract_merchant_name
-        
-        merchant_totals = {}
-        
-        for t in transactions:
-            if t.amount >= 0:
-                continue
-            
-            # Use merchant extractor for clean names
-            merchant = extract_merchant_name(t.description) if t.description else 'Unknown'
-            merchant_totals[merchant] = merchant_totals.get(merchant, 0) + abs(t.amount)
-        
-        sorted_merchants = sorted(merchant_totals.items(), key=lambda x: x[1], reverse=True)
-        
-        return [{'name': name, 'amount': round(amt, 2)} for name, amt in sorted_merchants[:limit]]
+        total = func.sum(-Transaction.amount)
+        sorted_merchants = session.query(Transaction.merchant, total).filter(
+            transaction_filter,
+            Transaction.amount < 0
+        ).group_by(Transaction.merchant).order_by(
+            total.desc(), func.min(Transaction.id)  # Ties keep first-seen order
+        ).limit(limit).all()
+        
+        return [{'name': name, 'amount': round(amt, 2)} for name, amt in sorted_merchants]
     
-    def _get_spending_trends(self, user_id, current_year, current_month, num_months=6):
+    def _get_spending_trends(self, user_id, current_year, current_month, num_months=6, session=None):
         """Get spending trends for the last N months."""
-        session = get_session()
+        own_session = session is None
+        if own_session:
+            session = get_session()
         try:
             trends = []
             excluded_ids = self._get_excluded_category_ids(session)
             
+            # Get the first month of the trend window
+            first_month = current_month - (num_months - 1)
+            first_year = current_year
+            while first_month <= 0:
+                first_month += 12
+                first_year -= 1
+            
+            # Sum income and expenses per month from the monthly rollup
+            month_index = MonthlyCategoryTotal.year * 12 + MonthlyCategoryTotal.month
+            counted = or_(
+                MonthlyCategoryTotal.category_id == 0,
+                ~MonthlyCategoryTotal.category_id.in_(excluded_ids)
+            )
+            rows = session.query(
+                MonthlyCategoryTotal.year,
+                MonthlyCategoryTotal.month,
+                func.sum(MonthlyCategoryTotal.income_cents),
+                func.sum(case((counted, MonthlyCategoryTotal.expense_cents), else_=0))
+            ).filter(
+                MonthlyCategoryTotal.user_id == user_id,
+                month_index >= first_year * 12 + first_month,
+                month_index <= current_year * 12 + current_month
+            ).group_by(MonthlyCategoryTotal.year, MonthlyCategoryTotal.month).all()
+            monthly_totals = {(y, m): (inc / 100, exp / 100) for y, m, inc, exp in rows}
+            
             for i in range(num_months - 1, -1, -1):
                 # Calculate month offset
                 month = current_month - i
@@ -198,26 +305,10 @@ class DashboardGenerator:
                     month += 12
                     year -= 1
                 
-                # Get date range
-                start_date = date(year, month, 1)
-                if month == 12:
-                    end_date = date(year + 1, 1, 1)
-                else:
-                    end_date = date(year, month + 1, 1)
-                
-                # Get transactions
-                transactions = session.query(Transaction).filter(
-                    Transaction.user_id == user_id,
-                    Transaction.date >= start_date,
-                    Transaction.date < end_date
-                ).all()
-                
-                income = sum(t.amount for t in transactions if t.amount > 0)
-                expenses = sum(abs(t.amount) for t in transactions 
-                              if t.amount < 0 and t.category_id not in excluded_ids)
+                income, expenses = monthly_totals.get((year, month), (0, 0))
                 
                 trends.append({
-                    'month': start_date.strftime('%b'),
+                    'month': MONTH_ABBRS[month],
                     'year': year,
                     'income': round(income, 2),
                     'expenses': round(expenses, 2),
@@ -226,28 +317,32 @@ class DashboardGenerator:
             
             return trends
         finally:
-            session.close()
+            if own_session:
+                session.close()
     
     def get_available_months(self, user_id=1):
         """Get list of months that have transactions."""
         session = get_session()
         
         try:
+            # Months come from the rollup, where each has one row per category
             results = session.query(
-                extract('year', Transaction.date).label('year'),
-                extract('month', Transaction.date).label('month')
+                MonthlyCategoryTotal.year,
+                MonthlyCategoryTotal.month
             ).filter(
-                Transaction.user_id == user_id
-            ).distinct().order_by(
-                extract('year', Transaction.date).desc(),
-                extract('month', Transaction.date).desc()
+                MonthlyCategoryTotal.user_id == user_id
+            ).group_by(
+                MonthlyCategoryTotal.year, MonthlyCategoryTotal.month
+            ).having(
+                func.sum(MonthlyCategoryTotal.txn_count) > 0
+            ).order_by(
+                MonthlyCategoryTotal.year.desc(),
+                MonthlyCategoryTotal.month.desc()
             ).all()
             
             months = []
-            for row in results:
-                year = int(row.year)
-                month = int(row.month)
-                label = date(year, month, 1).strftime('%b %Y')
+            for year, month in results:
+                label = f'{MONTH_ABBRS[month]} {year}'
                 months.append({'year': year, 'month': month, 'label': label})
             
             return months
@@ -265,54 +360,60 @@ class DashboardGenerator:
         'loan', 'payment', 'sierra', 'hair', 'beauty', 'grooming', 'subscriptions'
     }
     
+    # All keywords in one alternation, longest first, matched against lowercased names
+    _RECURRING_RE = re.compile('|'.join(
+        map(re.escape, sorted(RECURRING_KEYWORDS, key=len, reverse=True))
+    ))
+    
     def _is_recurring_category(self, category_name):
         """Check if category matches known recurring expense patterns."""
-        cat_lower = category_name.lower()
-        for keyword in self.RECURRING_KEYWORDS:
-            if keyword in cat_lower:
-                return True
-        return False
+        return self._RECURRING_RE.search(category_name.lower()) is not None
     
     def get_category_averages(self, months=3, user_id=1):
         """Get average spending by category over the last N months with recurring status."""
+        # The window is relative to today, so the date is part of the key
+        return self._cached(
+            ('averages', user_id, months, date.today()),
+            lambda: self._build_category_averages(months, user_id)
+        )
+    
+    def _build_category_averages(self, months, user_id):
+        """Compute average spending by category over the last N months."""
         session = get_session()
         
         try:
             # Get date range
             today = date.today()
-            start_date = date(today.year, today.month, 1)
-            for _ in range(months):
-                if start_date.month == 1:
-                    start_date = date(start_date.year - 1, 12, 1)
-                else:
-                    start_date = date(start_date.year, start_date.month - 1, 1)
+            month_index = today.year * 12 + today.month - 1 - months
+            start_date = date(month_index // 12, month_index % 12 + 1, 1)
             
             # Get user-marked recurring categories
-            user_marked_recurring = set()
-            recurring_transactions = session.query(Transaction).filter(
-                Transaction.user_id == user_id,
-                Transaction.is_recurring == True
-            ).all()
-            for t in recurring_transactions:
-                if t.category and t.category.name:
-                    user_marked_recurring.add(t.category.name)
-            
-            # Get transactions
-            transactions = session.query(Transaction).filter(
-                Transaction.user_id == user_id,
-                Transaction.date >= start_date,
-                Transaction.amount < 0
-            ).all()
+            user_marked_recurring = {
+                name for (name,) in session.query(Category.name).join(
+                    Transaction, Transaction.category_id == Category.id
+                ).filter(
+                    Transaction.user_id == user_id,
+                    Transaction.is_recurring == True
+                ).distinct()
+                if name
+            }
             
-            # Calculate totals by category
+            # Sum counted expenses by category from the monthly rollup
             excluded_ids = self._get_excluded_category_ids(session)
-            category_totals = {}
-            
-            for t in transactions:
-                if t.category_id in excluded_ids:
-                    continue
-                cat_name = t.category.name if t.category else 'Uncategorized'
-                category_totals[cat_name] = category_totals.get(cat_name, 0) + abs(t.amount)
+            cat_name = func.coalesce(Category.name, 'Uncategorized')
+            rows = session.query(
+                cat_name,
+                func.sum(MonthlyCategoryTotal.expense_cents)
+            ).outerjoin(
+                Category, Category.id == MonthlyCategoryTotal.category_id
+            ).filter(
+                MonthlyCategoryTotal.user_id == user_id,
+                MonthlyCategoryTotal.year * 12 + MonthlyCategoryTotal.month
+                    >= start_date.year * 12 + start_date.month,
+                MonthlyCategoryTotal.expense_count > 0,
+                ~MonthlyCategoryTotal.category_id.in_(excluded_ids)
+            ).group_by(cat_name).all()
+            category_totals = {name: cents / 100 for name, cents in rows}
             
             # Build result with recurring status
             result = {}
@@ -342,27 +443,33 @@ class DashboardGenerator:
             if not category:
                 return None
             
-            # Get all transactions for this category
-            transactions = session.query(Transaction).filter(
+            # Stream the needed columns of this category's transactions
+            rows = session.query(
+                Transaction.date,
+                Transaction.description,
+                Transaction.amount,
+                Transaction.is_recurring
+            ).filter(
                 Transaction.user_id == user_id,
                 Transaction.category_id == category.id,
                 Transaction.amount < 0
-            ).order_by(Transaction.date.desc()).all()
-            
-            # Group by month
-            monthly_data = {}
-            for t in transactions:
-                month_key = t.date.strftime('%Y-%m')
-                if month_key not in monthly_data:
-                    monthly_data[month_key] = {'total': 0, 'count': 0, 'transactions': []}
-                monthly_data[month_key]['total'] += abs(t.amount)
-                monthly_data[month_key]['count'] += 1
-                monthly_data[month_key]['transactions'].append({
-                    'date': t.date.isoformat(),
-                    'description': t.description,
-                    'amount': abs(t.amount),
-                    'is_recurring': t.is_recurring
+            ).order_by(Transaction.date.desc()).yield_per(1000)
+            
+            # Group by month, noting whether the user marked any as recurring
+            monthly_data = defaultdict(lambda: {'total': 0, 'count': 0, 'transactions': []})
+            has_recurring = False
+            for txn_date, description, amount, is_recurring in rows:
+                month_data = monthly_data[f'{txn_date.year:04d}-{txn_date.month:02d}']
+                month_data['total'] += abs(amount)
+                month_data['count'] += 1
+                month_data['transactions'].append({
+                    'date': txn_date.isoformat(),
+                    'description': description,
+                    'amount': abs(amount),
+                    'is_recurring': is_recurring
                 })
+                if is_recurring:
+                    has_recurring = True
             
             # Calculate statistics
             if monthly_data:
@@ -373,14 +480,9 @@ class DashboardGenerator:
             else:
                 avg = min_val = max_val = 0
             
-            # Check if user marked any as recurring
-            has_recurring = any(
-                t.is_recurring for t in transactions
-            )
-            
             return {
                 'category': category_name,
-                'months': monthly_data,
+                'months': dict(monthly_data),
                 'statistics': {
                     'average': round(avg, 2),
                     'min': round(min_val, 2),
@@ -394,39 +496,45 @@ class DashboardGenerator:
     
     def get_all_category_patterns(self, user_id=1):
         """Get monthly spending patterns for all categories."""
+        return self._cached(
+            ('patterns', user_id),
+            lambda: self._build_category_patterns(user_id)
+        )
+    
+    def _build_category_patterns(self, user_id):
+        """Compute monthly spending patterns for all categories."""
         session = get_session()
         
         try:
             excluded_ids = self._get_excluded_category_ids(session)
             
-            # Get all expense transactions grouped by category and month
-            transactions = session.query(Transaction).filter(
-                Transaction.user_id == user_id,
-                Transaction.amount < 0
-            ).all()
+            # Get expense totals by category and month from the monthly rollup
+            rows = session.query(
+                func.coalesce(Category.name, 'Uncategorized'),
+                MonthlyCategoryTotal.year,
+                MonthlyCategoryTotal.month,
+                MonthlyCategoryTotal.expense_cents,
+                MonthlyCategoryTotal.recurring_count
+            ).outerjoin(
+                Category, Category.id == MonthlyCategoryTotal.category_id
+            ).filter(
+                MonthlyCategoryTotal.user_id == user_id,
+                MonthlyCategoryTotal.expense_count > 0,
+                ~MonthlyCategoryTotal.category_id.in_(excluded_ids)
+            ).order_by(MonthlyCategoryTotal.year, MonthlyCategoryTotal.month).all()
             
             # Build category patterns
-            category_data = {}
-            for t in transactions:
-                if t.category_id in excluded_ids:
-                    continue
-                
-                cat_name = t.category.name if t.category else 'Uncategorized'
-                month_key = t.date.strftime('%Y-%m')
-                
-                if cat_name not in category_data:
-                    category_data[cat_name] = {
-                        'months': {},
-                        'has_recurring': False
-                    }
-                
-                if month_key not in category_data[cat_name]['months']:
-                    category_data[cat_name]['months'][month_key] = 0
-                
-                category_data[cat_name]['months'][month_key] += abs(t.amount)
+            category_data = defaultdict(lambda: {
+                'months': defaultdict(float),
+                'has_recurring': False
+            })
+            for cat_name, year, month, expense_cents, recurring_count in rows:
+                month_key = f'{year:04d}-{month:02d}'
+                data = category_data[cat_name]
+                data['months'][month_key] += expense_cents / 100
                 
-                if t.is_recurring:
-                    category_data[cat_name]['has_recurring'] = True
+                if recurring_count:
+                    data['has_recurring'] = True
             
             # Calculate statistics for each category
             result = {}
@@ -435,7 +543,7 @@ class DashboardGenerator:
                 if monthly_totals:
                     avg = sum(monthly_totals) / len(monthly_totals)
                     result[cat_name] = {
-                        'months': data['months'],
+                        'months': dict(data['months']),
                         'average': round(avg, 2),
                         'min': round(min(monthly_totals), 2),
                         'max': round(max(monthly_totals), 2),
@@ -447,55 +555,19 @@ class DashboardGenerator:
         finally:
             session.close()
     
-    def _get_previous_month_comparison(self, user_id, year, month, session):
+    def _get_previous_month_comparison(self, prev_year, prev_month, prev_totals):
         """Get previous month data for comparison."""
-        # Calculate previous month
-        if month == 1:
-            prev_year, prev_month = year - 1, 12
-        else:
-            prev_year, prev_month = year, month - 1
-        
-        # Get date range for previous month
-        prev_start = date(prev_year, prev_month, 1)
-        if prev_month == 12:
-            prev_end = date(prev_year + 1, 1, 1)
-        else:
-            prev_end = date(prev_year, prev_month + 1, 1)
-        
-        # Get previous month transactions
-        prev_transactions = session.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.date >= prev_start,
-            Transaction.date < prev_end
-        ).all()
-        
-        # Calculate previous month summary
-        excluded_ids = self._get_excluded_category_ids(session)
-        prev_income = sum(t.amount for t in prev_transactions if t.amount > 0)
-        prev_expenses = sum(
-            abs(t.amount) for t in prev_transactions 
-            if t.amount < 0 and t.category_id not in excluded_ids
-        )
-        prev_net = prev_income - prev_expenses
-        prev_savings_rate = (prev_net / prev_income * 100) if prev_income > 0 else 0
-        
-        # Get previous month category breakdown
-        prev_by_category = {}
-        for t in prev_transactions:
-            if t.amount >= 0 or t.category_id in excluded_ids:
-                continue
-            cat_name = t.category.name if t.category else 'Uncategorized'
-            prev_by_category[cat_name] = prev_by_category.get(cat_name, 0) + abs(t.amount)
+        prev_summary = self._calculate_summary(prev_totals)
         
         return {
             'prev_year': prev_year,
             'prev_month': prev_month,
-            'prev_month_name': date(prev_year, prev_month, 1).strftime('%B'),
-            'income': round(prev_income, 2),
-            'expenses': round(prev_expenses, 2),
-            'net': round(prev_net, 2),
-            'savings_rate': round(prev_savings_rate, 1),
-            'by_category': prev_by_category
+            'prev_month_name': MONTH_NAMES[prev_month],
+            'income': prev_summary['income'],
+            'expenses': prev_summary['expenses'],
+            'net': prev_summary['net'],
+            'savings_rate': prev_summary['savings_rate'],
+            'by_category': prev_totals['by_category']
         }
     
     def _generate_quick_insights(self, current_summary, prev_data, by_category, top_merchants):
@@ -5,19 +5,53 @@ Ensures categorized transactions survive repo cloning and server restarts.
 import json
 import os
 from datetime import date, datetime
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from models import get_session, Transaction, Category, User
+from merchant_extractor import extract_merchant_name
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'transactions_backup.json')
 
 
+def _dumps(value):
+    """Serialize a value as compact JSON, writing dates and datetimes as ISO strings."""
+    if orjson:
+        return orjson.dumps(value).decode()
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=lambda v: v.isoformat())
+
+
+def _write_rows(f, key, rows):
+    """Write rows as a JSON array member, one row per line. Returns the row count."""
+    f.write(f'  {_dumps(key)}: [')
+    count = 0
+    for count, row in enumerate(rows, 1):
+        f.write(',\n    ' if count > 1 else '\n    ')
+        f.write(_dumps(row))
+    f.write('\n  ]' if count else ']')
+    return count
+
+
+def _read_json(path):
+    """Read a JSON file."""
+    if orjson:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
 def export_data():
     """Export all transactions and categories to JSON file."""
     session = get_session()
     
     try:
         # Export categories
-        categories = session.query(Category).all()
-        categories_data = [
+        categories = session.query(Category.id, Category.name, Category.group, Category.user_id)
+        categories_data = (
             {
                 'id': c.id,
                 'name': c.name,
@@ -25,15 +59,24 @@ def export_data():
                 'user_id': c.user_id
             }
             for c in categories
-        ]
+        )
         
-        # Export transactions
-        transactions = session.query(Transaction).all()
-        transactions_data = [
+        # Export transactions, streaming rows instead of loading ORM objects
+        transactions = session.query(
+            Transaction.id,
+            Transaction.user_id,
+            Transaction.date,
+            Transaction.description,
+            Transaction.amount,
+            Transaction.category_id,
+            Transaction.source,
+            Transaction.is_recurring
+        ).yield_per(1000)
+        transactions_data = (
             {
                 'id': t.id,
                 'user_id': t.user_id,
-                'date': t.date.isoformat() if t.date else None,
+                'date': t.date,
                 'description': t.description,
                 'amount': float(t.amount) if t.amount else 0,
                 'category_id': t.category_id,
@@ -41,28 +84,27 @@ def export_data():
                 'is_recurring': t.is_recurring
             }
             for t in transactions
-        ]
+        )
         
         # Create data directory if needed
         os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
         
-        # Save to JSON
-        data = {
-            'exported_at': datetime.now().isoformat(),
-            'categories': categories_data,
-            'transactions': transactions_data
-        }
-        
-        with open(DATA_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Save to JSON, writing rows as they are read
+        with open(DATA_FILE, 'w', encoding='utf-8') as f:
+            f.write('{\n')
+            f.write(f'  "exported_at": {_dumps(datetime.now())},\n')
+            category_count = _write_rows(f, 'categories', categories_data)
+            f.write(',\n')
+            transaction_count = _write_rows(f, 'transactions', transactions_data)
+            f.write('\n}\n')
         
-        print(f"✓ Exported {len(categories_data)} categories and {len(transactions_data)} transactions")
+        print(f"✓ Exported {category_count} categories and {transaction_count} transactions")
         print(f"  Saved to: {DATA_FILE}")
         
         return {
             'success': True,
-            'categories': len(categories_data),
-            'transactions': len(transactions_data),
+            'categories': category_count,
+            'transactions': transaction_count,
             'file': DATA_FILE
         }
         
@@ -89,31 +131,31 @@ def import_data(force=False):
             return {'success': False, 'error': 'Database not empty', 'existing': existing_transactions}
         
         # Load backup data
-        with open(DATA_FILE, 'r') as f:
-            data = json.load(f)
+        data = _read_json(DATA_FILE)
         
         print(f"Loading backup from {data.get('exported_at', 'unknown date')}...")
         
         # Ensure default user exists
-        user = session.query(User).filter_by(id=1).first()
-        if not user:
-            user = User(id=1, email='default@example.com', name='Default User')
-            session.add(user)
-            session.commit()
+        session.execute(
+            sqlite_insert(User).values(id=1, name='Default User').on_conflict_do_nothing(index_elements=['id'])
+        )
         
         # Import categories first
         categories_imported = 0
         category_id_map = {}  # old_id -> new_id
         
+        # Load existing category IDs by (name, user_id) once
+        existing_categories = {}
+        for cat_id, name, user_id in session.query(Category.id, Category.name, Category.user_id).order_by(Category.id):
+            existing_categories.setdefault((name, user_id), cat_id)
+        
         for cat_data in data.get('categories', []):
             # Check if category already exists
-            existing = session.query(Category).filter_by(
-                name=cat_data['name'],
-                user_id=cat_data.get('user_id', 1)
-            ).first()
+            key = (cat_data['name'], cat_data.get('user_id', 1))
+            existing_id = existing_categories.get(key)
             
-            if existing:
-                category_id_map[cat_data['id']] = existing.id
+            if existing_id is not None:
+                category_id_map[cat_data['id']] = existing_id
             else:
                 category = Category(
                     name=cat_data['name'],
@@ -123,44 +165,50 @@ def import_data(force=False):
                 session.add(category)
                 session.flush()  # Get the ID
                 category_id_map[cat_data['id']] = category.id
+                existing_categories[key] = category.id
                 categories_imported += 1
         
         session.commit()
         
         # Import transactions
-        transactions_imported = 0
+        rows = []
         transactions_skipped = 0
         
+        # Load existing (date, description, amount, user_id) keys once for duplicate checks
+        existing_keys = {tuple(row) for row in session.query(
+            Transaction.date,
+            Transaction.description,
+            Transaction.amount,
+            Transaction.user_id
+        )}
+        
         for t_data in data.get('transactions', []):
             # Check for duplicate (same date, description, amount)
             t_date = date.fromisoformat(t_data['date']) if t_data.get('date') else None
+            key = (t_date, t_data['description'], t_data['amount'], t_data.get('user_id', 1))
             
-            existing = session.query(Transaction).filter_by(
-                date=t_date,
-                description=t_data['description'],
-                amount=t_data['amount'],
-                user_id=t_data.get('user_id', 1)
-            ).first()
-            
-            if existing:
+            if key in existing_keys:
                 transactions_skipped += 1
                 continue
+            existing_keys.add(key)
             
             # Map old category ID to new
             new_category_id = category_id_map.get(t_data.get('category_id'))
             
-            transaction = Transaction(
-                user_id=t_data.get('user_id', 1),
-                date=t_date,
-                description=t_data['description'],
-                amount=t_data['amount'],
-                category_id=new_category_id,
-                source=t_data.get('source'),
-                is_recurring=t_data.get('is_recurring', False)
-            )
-            session.add(transaction)
-            transactions_imported += 1
+            rows.append({
+                'user_id': t_data.get('user_id', 1),
+                'date': t_date,
+                'description': t_data['description'],
+                'merchant': extract_merchant_name(t_data['description']),
+                'amount': t_data['amount'],
+                'category_id': new_category_id,
+                'source': t_data.get('source'),
+                'is_recurring': t_data.get('is_recurring', False)
+            })
         
+        # Insert without building ORM instances
+        session.bulk_insert_mappings(Transaction, rows)
+        transactions_imported = len(rows)
         session.commit()
         
         print(f"✓ Imported {categories_imported} new categories")
@@ -2,7 +2,17 @@
 Extract simplified merchant names from transaction descriptions.
 """
 import re
+from functools import lru_cache
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+# Bump whenever the mappings or matching rules change, so stored merchant
+# names are recomputed on the next startup
+MERCHANT_RULES_VERSION = 2
 
 # Known merchant mappings (description pattern -> clean name)
 MERCHANT_MAPPINGS = {
@@ -81,6 +91,24 @@ MERCHANT_MAPPINGS = {
 }
 
 
+# Longest patterns first, so specific names beat generic processor prefixes
+# like 'sp ' or 'glf*'; equal lengths keep their mapping order
+_MERCHANT_PATTERNS = tuple(sorted(MERCHANT_MAPPINGS.items(), key=lambda item: -len(item[0])))
+
+
+def _build_automaton(patterns):
+    """Build an Aho-Corasick automaton mapping pattern -> (priority, merchant)."""
+    automaton = ahocorasick.Automaton()
+    for priority, (pattern, merchant) in enumerate(patterns):
+        automaton.add_word(pattern, (priority, merchant))
+    automaton.make_automaton()
+    return automaton
+
+
+_MERCHANT_AUTOMATON = _build_automaton(_MERCHANT_PATTERNS) if ahocorasick else None
+
+
+@lru_cache(maxsize=4096)
 def extract_merchant_name(description):
     """
     Extract a clean, simplified merchant name from a transaction description.
@@ -95,10 +123,15 @@ def extract_merchant_name(description):
     
     desc_lower = description.lower()
     
-    # Check known mappings first
-    for pattern, merchant in MERCHANT_MAPPINGS.items():
-        if pattern in desc_lower:
-            return merchant
+    # Check known mappings first; the longest matching pattern wins
+    if _MERCHANT_AUTOMATON is not None:
+        hits = [value for _, value in _MERCHANT_AUTOMATON.iter(desc_lower)]
+        if hits:
+            return min(hits)[1]
+    else:
+        for pattern, merchant in _MERCHANT_PATTERNS:
+            if pattern in desc_lower:
+                return merchant
     
     # Try to extract merchant from common patterns
     cleaned = _clean_description(description)
@@ -106,32 +139,36 @@ def extract_merchant_name(description):
     return cleaned if cleaned else "Unknown"
 
 
+# Common prefixes, each stripped at most once in this order
+_PREFIX_RE = re.compile(
+    r'^(?:\d{4}\s+)?'  # Date prefix like "1013 "
+    r'(?:MOBILE PURCHASE\s+\d+\s+)?'
+    r'(?:PURCHASE\s+)?'
+    r'(?:CHECKCARD\s+\d+\s+)?'
+    r'(?:POS\s+)?'
+    r'(?:SQ \*)?'  # Square
+    r'(?:TST\*)?',  # Toast
+    re.IGNORECASE
+)
+
+# Trailing location info (city, state, zip, phone), stripped in this order
+_SUFFIX_RES = (
+    re.compile(r'\s+\d{3}[-.]?\d{3}[-.]?\d{4}.*$'),  # Phone numbers
+    re.compile(r'\s+[A-Z]{2}\s*\d{5}(-\d{4})?$'),  # State + ZIP
+    re.compile(r'\s+[A-Z]{2}$'),  # Just state
+    re.compile(r'\s+\d{10,}$'),  # Long numbers at end
+    re.compile(r'\s+(AUSTIN|DALLAS|HOUSTON|TX|CA|NY|WA)\s*$', re.IGNORECASE),  # Common suffixes
+)
+
+
 def _clean_description(description):
     """Clean and simplify a transaction description."""
     # Remove common prefixes
-    prefixes = [
-        r'^\d{4}\s+',  # Date prefix like "1013 "
-        r'^MOBILE PURCHASE\s+\d+\s+',
-        r'^PURCHASE\s+',
-        r'^CHECKCARD\s+\d+\s+',
-        r'^POS\s+',
-        r'^SQ \*',  # Square
-        r'^TST\*',  # Toast
-    ]
-    
-    text = description
-    for prefix in prefixes:
-        text = re.sub(prefix, '', text, flags=re.IGNORECASE)
-    
-    # Remove trailing location info (city, state, zip, phone)
-    # Pattern: city STATE or city STATE ZIP or phone numbers
-    text = re.sub(r'\s+\d{3}[-.]?\d{3}[-.]?\d{4}.*$', '', text)  # Phone numbers
-    text = re.sub(r'\s+[A-Z]{2}\s*\d{5}(-\d{4})?$', '', text)  # State + ZIP
-    text = re.sub(r'\s+[A-Z]{2}$', '', text)  # Just state
-    text = re.sub(r'\s+\d{10,}$', '', text)  # Long numbers at end
+    text = _PREFIX_RE.sub('', description, count=1)
     
-    # Remove common suffixes
-    text = re.sub(r'\s+(AUSTIN|DALLAS|HOUSTON|TX|CA|NY|WA)\s*$', '', text, flags=re.IGNORECASE)
+    # Remove trailing location info and common suffixes
+    for suffix_re in _SUFFIX_RES:
+        text = suffix_re.sub('', text)
     
     # Clean up extra whitespace
     text = ' '.join(text.split())
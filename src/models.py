@@ -2,9 +2,11 @@
 SQLAlchemy models for Personal Finance Tracker.
 """
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Text
+from functools import lru_cache
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.orm import relationship, sessionmaker, validates, Session
+from merchant_extractor import MERCHANT_RULES_VERSION, extract_merchant_name
 
 Base = declarative_base()
 
@@ -57,11 +59,24 @@ class Transaction(Base):
     source = Column(String(100))  # Bank name
     raw_category = Column(String(100))  # Original category from bank
     is_recurring = Column(Boolean, default=False)  # User-marked recurring transaction
+    merchant = Column(String(100))  # Clean merchant name derived from description
     created_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship('User', back_populates='transactions')
     category = relationship('Category', back_populates='transactions')
     
+    __table_args__ = (
+        Index('ix_txn_user_date_cat', 'user_id', 'date', 'category_id'),  # Date-range filters
+        Index('ix_txn_user_cat_date', 'user_id', 'category_id', 'date'),  # Per-category history
+        Index('ix_txn_user_recurring', 'user_id', 'is_recurring'),  # User-marked recurring lookups
+        Index('ix_txn_dedup', 'user_id', 'date', 'description', 'amount'),  # Duplicate checks on import
+    )
+    
+    @validates('description')
+    def _set_merchant(self, key, description):
+        self.merchant = extract_merchant_name(description)
+        return description
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -73,6 +88,100 @@ class Transaction(Base):
         }
 
 
+class MonthlyCategoryTotal(Base):
+    """
+    Per-month, per-category rollup of transactions, maintained by SQLite triggers.
+    
+    Amounts are stored in cents. category_id is 0 for transactions with no category.
+    """
+    __tablename__ = 'monthly_category_totals'
+    
+    user_id = Column(Integer, primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    category_id = Column(Integer, primary_key=True)
+    income_cents = Column(Integer, nullable=False, default=0)
+    expense_cents = Column(Integer, nullable=False, default=0)
+    txn_count = Column(Integer, nullable=False, default=0)
+    expense_count = Column(Integer, nullable=False, default=0)
+    recurring_count = Column(Integer, nullable=False, default=0)  # Recurring expenses
+
+
+def _rollup_upsert(row, sign):
+    """SQL adding (sign=1) or removing (sign=-1) one transaction row in the monthly rollup."""
+    return f"""
+        INSERT INTO monthly_category_totals
+            (user_id, year, month, category_id,
+             income_cents, expense_cents, txn_count, expense_count, recurring_count)
+        VALUES (
+            {row}.user_id,
+            CAST(strftime('%Y', {row}.date) AS INTEGER),
+            CAST(strftime('%m', {row}.date) AS INTEGER),
+            COALESCE({row}.category_id, 0),
+            {sign} * (CASE WHEN {row}.amount > 0 THEN CAST(ROUND({row}.amount * 100) AS INTEGER) ELSE 0 END),
+            {sign} * (CASE WHEN {row}.amount < 0 THEN CAST(ROUND(-{row}.amount * 100) AS INTEGER) ELSE 0 END),
+            {sign},
+            {sign} * ({row}.amount < 0),
+            {sign} * ({row}.amount < 0 AND COALESCE({row}.is_recurring, 0))
+        )
+        ON CONFLICT (user_id, year, month, category_id) DO UPDATE SET
+            income_cents = income_cents + excluded.income_cents,
+            expense_cents = expense_cents + excluded.expense_cents,
+            txn_count = txn_count + excluded.txn_count,
+            expense_count = expense_count + excluded.expense_count,
+            recurring_count = recurring_count + excluded.recurring_count;
+    """
+
+
+# Triggers keep the rollup current for every write, including bulk inserts
+# and deletes that bypass ORM session events
+ROLLUP_TRIGGERS = {
+    'trg_txn_rollup_insert': f"""
+    AFTER INSERT ON transactions
+    BEGIN {_rollup_upsert('NEW', 1)} END
+    """,
+    'trg_txn_rollup_delete': f"""
+    AFTER DELETE ON transactions
+    BEGIN {_rollup_upsert('OLD', -1)} END
+    """,
+    'trg_txn_rollup_update': f"""
+    AFTER UPDATE OF user_id, date, amount, category_id, is_recurring ON transactions
+    BEGIN {_rollup_upsert('OLD', -1)} {_rollup_upsert('NEW', 1)} END
+    """,
+}
+
+
+def _create_rollup_triggers(engine):
+    """(Re)install the rollup triggers so they match the current rollup columns."""
+    with engine.begin() as conn:
+        for name, body in ROLLUP_TRIGGERS.items():
+            conn.exec_driver_sql(f'DROP TRIGGER IF EXISTS {name}')
+            conn.exec_driver_sql(f'CREATE TRIGGER {name} {body}')
+
+
+def rebuild_monthly_totals(engine=None):
+    """Recompute the monthly rollup from scratch from the transactions table."""
+    with (engine or get_engine()).begin() as conn:
+        conn.execute(text("DELETE FROM monthly_category_totals"))
+        conn.execute(text("""
+            INSERT INTO monthly_category_totals
+                (user_id, year, month, category_id,
+                 income_cents, expense_cents, txn_count, expense_count, recurring_count)
+            SELECT
+                user_id,
+                CAST(strftime('%Y', date) AS INTEGER),
+                CAST(strftime('%m', date) AS INTEGER),
+                COALESCE(category_id, 0),
+                SUM(CASE WHEN amount > 0 THEN CAST(ROUND(amount * 100) AS INTEGER) ELSE 0 END),
+                SUM(CASE WHEN amount < 0 THEN CAST(ROUND(-amount * 100) AS INTEGER) ELSE 0 END),
+                COUNT(*),
+                SUM(amount < 0),
+                SUM(amount < 0 AND COALESCE(is_recurring, 0))
+            FROM transactions
+            GROUP BY 1, 2, 3, 4
+        """))
+
+
 class Budget(Base):
     """Budget for tracking spending goals."""
     __tablename__ = 'budgets'
@@ -86,6 +195,10 @@ class Budget(Base):
     
     user = relationship('User', back_populates='budgets')
     items = relationship('BudgetItem', back_populates='budget', cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        Index('ix_budget_user', 'user_id'),
+    )
 
 
 class BudgetItem(Base):
@@ -119,6 +232,10 @@ class SavingsGoal(Base):
     
     user = relationship('User', backref='savings_goals')
     
+    __table_args__ = (
+        Index('ix_savings_goal_user', 'user_id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -138,11 +255,32 @@ _engine = None
 _Session = None
 
 
-def get_engine(db_path='finances.db'):
-    """Get or create database engine."""
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune each new SQLite connection for a single-user local database."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')  # Readers don't block the writer
+    cursor.execute('PRAGMA synchronous=NORMAL')  # Safe with WAL; fsync at checkpoints only
+    cursor.execute('PRAGMA cache_size=-65536')  # 64 MB page cache
+    cursor.execute('PRAGMA mmap_size=268435456')  # Memory-map up to 256 MB of the file
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+
+@lru_cache(maxsize=8)
+def _make_engine(db_path):
+    """Create an engine for the SQLite database at db_path, shared per path."""
+    engine = create_engine(f'sqlite:///{db_path}', echo=False)
+    event.listen(engine, 'connect', _set_sqlite_pragmas)
+    return engine
+
+
+def get_engine(db_path=None):
+    """Get the current database engine, or the shared engine for db_path if given."""
     global _engine
+    if db_path is not None:
+        return _make_engine(db_path)
     if _engine is None:
-        _engine = create_engine(f'sqlite:///{db_path}', echo=False)
+        _engine = _make_engine('finances.db')
     return _engine
 
 
@@ -154,13 +292,88 @@ def get_session():
     return _Session()
 
 
+# Incremented on every commit so read caches can tell when data may have changed
+_data_version = 0
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_data_version(session):
+    global _data_version
+    _data_version += 1
+
+
+def get_data_version():
+    """Get a counter that changes whenever any session commits."""
+    return _data_version
+
+
+def _add_missing_columns(engine):
+    """Add columns added after the tables already existed."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(
+                        f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                    )
+
+
+def _backfill_merchants():
+    """
+    Fill in merchant names for transactions stored before the column existed.
+    
+    The merchant rules version the stored names were computed with is kept in
+    PRAGMA user_version; when the rules change, every row is recomputed.
+    """
+    session = get_session()
+    try:
+        stored_version = session.execute(text('PRAGMA user_version')).scalar()
+        query = session.query(Transaction.id, Transaction.description)
+        if stored_version == MERCHANT_RULES_VERSION:
+            query = query.filter(Transaction.merchant.is_(None))
+        rows = query.all()
+        
+        if rows:
+            session.bulk_update_mappings(Transaction, [
+                {'id': txn_id, 'merchant': extract_merchant_name(description)}
+                for txn_id, description in rows
+            ])
+        session.execute(text(f'PRAGMA user_version = {MERCHANT_RULES_VERSION:d}'))
+        session.commit()
+    finally:
+        session.close()
+
+
+def _create_missing_indexes(engine):
+    """Create indexes added after the tables already existed."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
 def init_db(db_path='finances.db'):
     """Initialize database with tables and default data."""
     global _engine, _Session
-    _engine = create_engine(f'sqlite:///{db_path}', echo=False)
+    _engine = _make_engine(db_path)
     _Session = sessionmaker(bind=_engine)
     
+    # Backfill the rollup when it is first created or gains columns
+    inspector = inspect(_engine)
+    rollup = MonthlyCategoryTotal.__table__
+    needs_rollup = not inspector.has_table(rollup.name) or (
+        {column['name'] for column in inspector.get_columns(rollup.name)} != set(rollup.columns.keys())
+    )
+    
     Base.metadata.create_all(_engine)
+    _add_missing_columns(_engine)
+    _create_missing_indexes(_engine)
+    _create_rollup_triggers(_engine)
+    if needs_rollup:
+        rebuild_monthly_totals(_engine)
+    _backfill_merchants()
     
     session = get_session()
     
@@ -192,8 +405,10 @@ def init_db(db_path='finances.db'):
             ('Uncategorized', 'Other'),
         ]
         
-        for name, group in default_categories:
-            session.add(Category(name=name, group=group, user_id=user.id))
+        session.bulk_insert_mappings(Category, [
+            {'name': name, 'group': group, 'user_id': user.id}
+            for name, group in default_categories
+        ])
         
         session.commit()
     
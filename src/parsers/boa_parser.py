@@ -4,7 +4,6 @@ Extracts transactions from Bank of America checking/savings account statements.
 """
 import re
 from datetime import datetime
-from dateutil import parser as date_parser
 import pdfplumber
 
 
@@ -21,6 +20,13 @@ class BoAParser:
         self.amount_pattern = re.compile(r'(-?[\d,]+\.\d{2})$')
         # Amount on its own line (continuation from previous)
         self.amount_only_pattern = re.compile(r'^(-?[\d,]+\.\d{2})$')
+        # Headers, footers and notices that are never transactions (matched on lowercased lines)
+        self.skip_pattern = re.compile('|'.join(re.escape(skip) for skip in [
+            'date description amount', 'continued on', 'page ', 'account #',
+            'ending balance', 'beginning balance', 'account security',
+            'check your security', 'mobile banking', 'scan the code',
+            'braille and large print'
+        ]))
     
     def parse_statement(self, pdf_path, year=None):
         """
@@ -40,23 +46,23 @@ class BoAParser:
         
         try:
             with pdfplumber.open(pdf_path) as pdf:
-                full_text = ""
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        full_text += text + "\n"
-                
-                transactions = self._parse_all_text(full_text, year)
+                transactions = self._parse_lines(self._iter_page_lines(pdf), year)
         except Exception as e:
             print(f"Error parsing PDF {pdf_path}: {e}")
             return []
         
         return transactions
     
-    def _parse_all_text(self, text, year):
-        """Parse all text from the PDF for transactions."""
+    def _iter_page_lines(self, pdf):
+        """Yield text lines page by page, so only one page's text is held at a time."""
+        for page in pdf.pages:
+            text = page.extract_text()
+            if text:
+                yield from text.split('\n')
+    
+    def _parse_lines(self, lines, year):
+        """Parse statement lines for transactions, carrying section state across pages."""
         transactions = []
-        lines = text.split('\n')
         
         in_deposits = False
         in_withdrawals = False
@@ -68,19 +74,20 @@ class BoAParser:
             # Skip empty lines
             if not line:
                 continue
+            line_lower = line.lower()
             
             # Detect section starts
-            if 'deposits and other additions' in line.lower():
+            if 'deposits and other additions' in line_lower:
                 in_deposits = True
                 in_withdrawals = False
                 continue
-            elif 'withdrawals and other subtractions' in line.lower():
+            elif 'withdrawals and other subtractions' in line_lower:
                 in_deposits = False
                 in_withdrawals = True
                 continue
             
             # End sections
-            if 'total deposits' in line.lower() or 'total withdrawals' in line.lower():
+            if 'total deposits' in line_lower or 'total withdrawals' in line_lower:
                 in_deposits = False
                 in_withdrawals = False
                 # Save any pending transaction
@@ -90,12 +97,7 @@ class BoAParser:
                 continue
             
             # Skip non-transaction lines
-            if any(skip in line.lower() for skip in [
-                'date description amount', 'continued on', 'page ', 'account #',
-                'ending balance', 'beginning balance', 'account security',
-                'check your security', 'mobile banking', 'scan the code',
-                'braille and large print'
-            ]):
+            if self.skip_pattern.search(line_lower):
                 continue
             
             if not (in_deposits or in_withdrawals):
@@ -185,8 +187,8 @@ class BoAParser:
     def _create_transaction(self, date_str, description, amount_str, year, is_withdrawal=False):
         """Create a transaction dictionary."""
         try:
-            # Parse date
-            date = date_parser.parse(date_str)
+            # Parse date (always MM/DD/YY on BoA statements)
+            date = datetime.strptime(date_str, '%m/%d/%y')
             if date.year < 2000:
                 date = date.replace(year=year)
             
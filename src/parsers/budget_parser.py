@@ -2,8 +2,23 @@
 Budget Excel/CSV Parser for importing user budget files.
 Handles multi-section budget formats with categories and amounts in paired columns.
 """
+import copy
+import hashlib
+import io
 import pandas as pd
+from collections import OrderedDict
 from datetime import date
+from threading import Lock
+
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+# Read workbooks with the Rust calamine reader when installed, else pandas' default
+# engine; pandas only accepts engine='calamine' from 2.2 onwards
+PANDAS_VERSION = tuple(int(part) for part in pd.__version__.split('.')[:2])
+EXCEL_ENGINE = 'calamine' if python_calamine and PANDAS_VERSION >= (2, 2) else None
 
 
 class BudgetParser:
@@ -30,8 +45,15 @@ class BudgetParser:
     
     DEFAULT_SECTIONS = EXCEL_SECTIONS
     
+    # Number of parsed uploads kept by the parse cache
+    PARSE_CACHE_SIZE = 32
+    
     def __init__(self):
         self.sections = self.DEFAULT_SECTIONS
+        
+        # Parsed uploads keyed by content hash, format and header row, least recently used first
+        self._parse_cache = OrderedDict()
+        self._parse_cache_lock = Lock()
     
     def parse_excel(self, file_path, header_row=7):
         """
@@ -44,7 +66,7 @@ class BudgetParser:
         Returns:
             dict with budget items grouped by section
         """
-        df = pd.read_excel(file_path, header=None)
+        df = pd.read_excel(file_path, header=None, engine=EXCEL_ENGINE)
         return self._parse_dataframe(df, header_row)
     
     def parse_csv(self, file_path, header_row=7):
@@ -60,8 +82,7 @@ class BudgetParser:
         """
         df = pd.read_csv(file_path, header=None)
         # Use CSV-specific column mappings
-        self.sections = self.CSV_SECTIONS
-        return self._parse_dataframe(df, header_row)
+        return self._parse_dataframe(df, header_row, self.CSV_SECTIONS)
     
     def parse_file_object(self, file_obj, filename, header_row=7):
         """
@@ -75,22 +96,38 @@ class BudgetParser:
         Returns:
             dict with budget items grouped by section
         """
-        if filename.endswith('.xlsx') or filename.endswith('.xls'):
-            df = pd.read_excel(file_obj, header=None)
-            self.sections = self.EXCEL_SECTIONS
+        is_excel = filename.endswith('.xlsx') or filename.endswith('.xls')
+        
+        # Previewing and then importing uploads the same file twice; parse it once
+        content = file_obj.read()
+        key = (hashlib.sha256(content).hexdigest(), is_excel, header_row)
+        with self._parse_cache_lock:
+            if key in self._parse_cache:
+                self._parse_cache.move_to_end(key)
+                return copy.deepcopy(self._parse_cache[key])
+        
+        if is_excel:
+            df = pd.read_excel(io.BytesIO(content), header=None, engine=EXCEL_ENGINE)
+            sections = self.EXCEL_SECTIONS
         else:
-            df = pd.read_csv(file_obj, header=None)
-            self.sections = self.CSV_SECTIONS
+            df = pd.read_csv(io.BytesIO(content), header=None)
+            sections = self.CSV_SECTIONS
         
-        return self._parse_dataframe(df, header_row)
+        result = self._parse_dataframe(df, header_row, sections)
+        with self._parse_cache_lock:
+            self._parse_cache[key] = result
+            if len(self._parse_cache) > self.PARSE_CACHE_SIZE:
+                self._parse_cache.popitem(last=False)
+        return copy.deepcopy(result)
     
-    def _parse_dataframe(self, df, header_row):
+    def _parse_dataframe(self, df, header_row, sections=None):
         """
         Parse a DataFrame with the multi-section budget format.
         
         Args:
             df: pandas DataFrame
             header_row: Row number where headers are located
+            sections: Column mappings to use (defaults to self.sections)
             
         Returns:
             dict with budget items grouped by section
@@ -105,52 +142,53 @@ class BudgetParser:
         # Start parsing from the row after headers
         data_start = header_row + 1
         
-        for cat_col, amt_col, group_name in self.sections:
+        if sections is None:
+            sections = self.sections
+        
+        rows = df.iloc[data_start:]
+        
+        for cat_col, amt_col, group_name in sections:
             section_items = []
+            result['sections'][group_name] = section_items
             
-            # Iterate through rows starting after header
-            for idx in range(data_start, len(df)):
-                try:
-                    category = df.iloc[idx, cat_col]
-                    amount = df.iloc[idx, amt_col]
-                    
-                    # Skip empty rows
-                    if pd.isna(category) or str(category).strip() == '':
-                        continue
-                    
-                    # Clean up category name
-                    category = str(category).strip()
-                    
-                    # Parse amount
-                    if pd.isna(amount):
-                        amount = 0
-                    else:
-                        try:
-                            # Handle string amounts with $ or commas
-                            if isinstance(amount, str):
-                                amount = amount.replace('$', '').replace(',', '').strip()
-                            amount = float(amount)
-                        except (ValueError, TypeError):
-                            result['parse_errors'].append(
-                                f"Could not parse amount for '{category}': {amount}"
-                            )
-                            amount = 0
-                    
-                    # Skip zero amounts unless it's a valid category
-                    if amount > 0 or category.lower() not in ['nan', 'none', '']:
-                        item = {
-                            'category': category,
-                            'amount': round(amount, 2),
-                            'group': group_name
-                        }
-                        section_items.append(item)
-                        result['all_items'].append(item)
-                        result['total_budget'] += amount
-                        
-                except Exception as e:
-                    result['parse_errors'].append(f"Error parsing row {idx}: {str(e)}")
+            if max(cat_col, amt_col) >= df.shape[1]:
+                if len(rows):
+                    result['parse_errors'].append(f"Missing columns for '{group_name}'")
+                continue
             
-            result['sections'][group_name] = section_items
+            # Skip empty rows and clean up category names
+            categories = rows.iloc[:, cat_col]
+            names = categories.astype(str).str.strip()
+            present = (categories.notna() & (names != '')).to_numpy()
+            names = names[present]
+            raw = rows.iloc[:, amt_col][present]
+            
+            # Parse amounts in bulk, retrying text cells with $ or commas stripped
+            amounts = pd.to_numeric(raw, errors='coerce').astype(float)
+            retry = (amounts.isna() & raw.notna()).to_numpy()
+            if retry.any():
+                cleaned = raw[retry].astype(str).str.replace(r'[$,]', '', regex=True).str.strip()
+                amounts[retry] = pd.to_numeric(cleaned, errors='coerce').to_numpy(dtype=float)
+                unparsed = amounts[retry].isna().to_numpy()
+                for category, amount in zip(names[retry][unparsed], cleaned[unparsed]):
+                    result['parse_errors'].append(
+                        f"Could not parse amount for '{category}': {amount}"
+                    )
+            
+            for category, amount in zip(names.tolist(), amounts.tolist()):
+                if pd.isna(amount):
+                    amount = 0
+                
+                # Skip zero amounts unless it's a valid category
+                if amount > 0 or category.lower() not in ['nan', 'none', '']:
+                    item = {
+                        'category': category,
+                        'amount': round(amount, 2),
+                        'group': group_name
+                    }
+                    section_items.append(item)
+                    result['all_items'].append(item)
+                    result['total_budget'] += amount
         
         result['total_budget'] = round(result['total_budget'], 2)
         return result
@@ -168,6 +206,7 @@ class BudgetParser:
         """
         # Create lowercase lookup for existing categories
         existing_lookup = {c['name'].lower(): c for c in existing_categories}
+        existing_pairs = list(existing_lookup.items())
         
         mapping = {}
         for item in parsed_budget['all_items']:
@@ -182,9 +221,9 @@ class BudgetParser:
                     'category_name': existing_lookup[cat_lower]['name']
                 }
             else:
-                # Try partial matching
+                # Try partial matching, in lookup order
                 matched = None
-                for existing_name, existing_cat in existing_lookup.items():
+                for existing_name, existing_cat in existing_pairs:
                     if cat_lower in existing_name or existing_name in cat_lower:
                         matched = existing_cat
                         break
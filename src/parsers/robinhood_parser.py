@@ -2,7 +2,6 @@
 Robinhood Credit Card CSV transaction parser.
 """
 import pandas as pd
-from datetime import datetime
 
 
 class RobinhoodParser:
@@ -30,70 +29,69 @@ class RobinhoodParser:
     
     def _process_dataframe(self, df):
         """Process dataframe into transaction list."""
-        transactions = []
-        
         # Normalize column names
         df.columns = df.columns.str.lower().str.strip()
         
         print(f"Robinhood CSV columns: {list(df.columns)}")
         
-        for _, row in df.iterrows():
-            try:
-                # Parse date
-                date_val = row.get('date')
-                if pd.isna(date_val):
-                    continue
-                
-                if isinstance(date_val, str):
-                    date = pd.to_datetime(date_val).date()
-                else:
-                    date = date_val.date() if hasattr(date_val, 'date') else date_val
-                
-                # Get merchant (primary identifier)
-                merchant = ''
-                if 'merchant' in df.columns and not pd.isna(row.get('merchant')):
-                    merchant = str(row['merchant']).strip()
-                
-                # Get description (secondary info)
-                desc = ''
-                if 'description' in df.columns and not pd.isna(row.get('description')):
-                    desc = str(row['description']).strip()
-                
-                # Combine merchant and description for full description
-                if merchant and desc:
-                    description = f"{merchant} - {desc}"
-                elif merchant:
-                    description = merchant
-                elif desc:
-                    description = desc
-                else:
-                    # Fallback to type
-                    txn_type = row.get('type', '')
-                    description = str(txn_type) if not pd.isna(txn_type) else 'Unknown'
-                
-                # Parse amount
-                amount_val = row.get('amount')
-                if pd.isna(amount_val):
-                    continue
-                
-                if isinstance(amount_val, str):
-                    amount = float(amount_val.replace('$', '').replace(',', ''))
-                else:
-                    amount = float(amount_val)
-                
-                # Skip zero amounts
-                if amount == 0:
-                    continue
-                
-                transactions.append({
-                    'date': date,
-                    'description': description,
-                    'amount': amount,
-                    'source': self.source,
-                    'raw_category': row.get('type', None)
-                })
-            except Exception as e:
-                print(f"Error processing row: {e}")
-                continue
+        if 'date' not in df.columns or 'amount' not in df.columns:
+            return []
+        
+        # Parse dates and amounts column-wise; values that fail to parse become NaT/NaN
+        dates = _parse_dates(df['date'])
+        amounts = pd.to_numeric(df['amount'].replace(r'[$,]', '', regex=True), errors='coerce').astype(float)
+        
+        invalid = (df['date'].notna() & dates.isna()) | (df['amount'].notna() & amounts.isna())
+        if invalid.any():
+            print(f"Error processing {invalid.sum()} rows: unparseable date or amount")
+        
+        # Combine merchant (primary identifier) and description (secondary info)
+        merchant = _text_column(df, 'merchant')
+        desc = _text_column(df, 'description')
+        description = merchant.where(merchant != '', desc)
+        description = description.mask((merchant != '') & (desc != ''), merchant + ' - ' + desc)
+        
+        # Fallback to type
+        if 'type' in df.columns:
+            raw_category = df['type']
+            fallback = raw_category.astype(str).where(raw_category.notna(), 'Unknown')
+        else:
+            raw_category = pd.Series([None] * len(df), index=df.index, dtype=object)
+            fallback = ''
+        description = description.where(description != '', fallback)
         
-        return transactions
+        # Skip rows without a date or amount, and zero amounts
+        keep = dates.notna() & amounts.notna() & (amounts != 0)
+        
+        return [
+            {
+                'date': date,
+                'description': description,
+                'amount': amount,
+                'source': self.source,
+                'raw_category': category
+            }
+            for date, description, amount, category in zip(
+                dates[keep].tolist(), description[keep].tolist(),
+                amounts[keep].tolist(), raw_category[keep].tolist()
+            )
+        ]
+
+
+def _text_column(df, column):
+    """Get a column as stripped strings, with '' for missing values or a missing column."""
+    if column not in df.columns:
+        return pd.Series('', index=df.index)
+    values = df[column]
+    return values.astype(str).str.strip().where(values.notna(), '')
+
+
+def _parse_dates(values):
+    """Parse a column to dates, with NaT where a value can't be parsed."""
+    try:
+        return pd.to_datetime(values, errors='coerce', format='mixed').dt.date
+    except ValueError:
+        # Mixed timezone offsets can't share one dtype; parse each value on its own
+        return values.map(lambda v: pd.to_datetime(v, errors='coerce')).map(
+            lambda v: v.date() if pd.notna(v) else pd.NaT
+        )
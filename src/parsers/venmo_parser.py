@@ -30,57 +30,72 @@ class VenmoParser:
     
     def _process_dataframe(self, df):
         """Process dataframe into transaction list."""
-        transactions = []
-        
         # Normalize column names
         df.columns = df.columns.str.lower().str.strip()
         
-        for _, row in df.iterrows():
-            try:
-                # Parse date
-                date_col = 'datetime' if 'datetime' in df.columns else 'date'
-                date_val = row.get(date_col)
-                if pd.isna(date_val):
-                    continue
-                
-                date = pd.to_datetime(date_val).date()
-                
-                # Build description from note and recipient
-                note = str(row.get('note', '')) if not pd.isna(row.get('note')) else ''
-                to_user = str(row.get('to', '')) if not pd.isna(row.get('to')) else ''
-                from_user = str(row.get('from', '')) if not pd.isna(row.get('from')) else ''
-                
-                if to_user:
-                    description = f"To {to_user}: {note}"
-                elif from_user:
-                    description = f"From {from_user}: {note}"
-                else:
-                    description = note or 'Venmo Transaction'
-                
-                # Parse amount
-                amount_val = row.get('amount (total)')
-                if pd.isna(amount_val):
-                    amount_val = row.get('amount')
-                
-                if pd.isna(amount_val):
-                    continue
-                
-                if isinstance(amount_val, str):
-                    # Remove currency symbols and handle negative
-                    amount_str = amount_val.replace('$', '').replace(',', '').strip()
-                    amount = float(amount_str)
-                else:
-                    amount = float(amount_val)
-                
-                transactions.append({
-                    'date': date,
-                    'description': description.strip(),
-                    'amount': amount,
-                    'source': self.source,
-                    'raw_category': None
-                })
-            except Exception as e:
-                print(f"Error processing row: {e}")
-                continue
+        date_col = 'datetime' if 'datetime' in df.columns else 'date'
+        if date_col not in df.columns:
+            return []
+        
+        # Use the total amount, falling back to the plain amount where it is missing
+        raw_amounts = _column(df, 'amount (total)')
+        raw_amounts = raw_amounts.where(raw_amounts.notna(), _column(df, 'amount'))
+        
+        # Parse dates and amounts column-wise; values that fail to parse become NaT/NaN
+        dates = _parse_dates(df[date_col])
+        amounts = pd.to_numeric(
+            raw_amounts.replace(r'[$,]', '', regex=True), errors='coerce'
+        ).astype(float)
+        
+        invalid = df[date_col].notna() & (dates.isna() | (raw_amounts.notna() & amounts.isna()))
+        if invalid.any():
+            print(f"Error processing {invalid.sum()} rows: unparseable date or amount")
+        
+        # Build description from note and recipient
+        note = _text_column(df, 'note')
+        to_user = _text_column(df, 'to')
+        from_user = _text_column(df, 'from')
+        description = note.where(note != '', 'Venmo Transaction')
+        description = description.mask(from_user != '', 'From ' + from_user + ': ' + note)
+        description = description.mask(to_user != '', 'To ' + to_user + ': ' + note)
+        description = description.str.strip()
+        
+        # Skip rows without a date or amount
+        keep = dates.notna() & amounts.notna()
         
-        return transactions
+        return [
+            {
+                'date': date,
+                'description': description,
+                'amount': amount,
+                'source': self.source,
+                'raw_category': None
+            }
+            for date, description, amount in zip(
+                dates[keep].tolist(), description[keep].tolist(), amounts[keep].tolist()
+            )
+        ]
+
+
+def _column(df, column):
+    """Get a column, or an all-missing column if it doesn't exist."""
+    if column not in df.columns:
+        return pd.Series([None] * len(df), index=df.index, dtype=object)
+    return df[column]
+
+
+def _text_column(df, column):
+    """Get a column as strings, with '' for missing values or a missing column."""
+    values = _column(df, column)
+    return values.astype(str).where(values.notna(), '')
+
+
+def _parse_dates(values):
+    """Parse a column to dates, with NaT where a value can't be parsed."""
+    try:
+        return pd.to_datetime(values, errors='coerce', format='mixed').dt.date
+    except ValueError:
+        # Mixed timezone offsets can't share one dtype; parse each value on its own
+        return values.map(lambda v: pd.to_datetime(v, errors='coerce')).map(
+            lambda v: v.date() if pd.notna(v) else pd.NaT
+        )